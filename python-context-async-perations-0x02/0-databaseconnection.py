@@ -1,25 +1,44 @@
 import sqlite3
 
+from db_pool import get_pool
+
 class DatabaseConnection:
     """A context manager for managing SQLite database connections."""
 
-    """Initializes the DatabaseConnection with the database name."""
+    """
+    Initializes the DatabaseConnection with the database name.
+
+    Connections come from the shared pool for `db_name`, so a short 'with'
+    block reuses a warm connection (PRAGMAs applied, statement cache
+    filled) instead of paying for connect and close every time.
+    """
     def __init__(self, db_name):
         self.db_name = db_name
+        self.pool = None
         self.conn = None
         self.cursor = None
-    """The begining of the 'with' block to open the database connection."""
+    """The begining of the 'with' block to check a connection out of the pool."""
     def __enter__(self):
         print("Opening database connection...")
-        self.conn = sqlite3.connect(self.db_name)
+        self.pool = get_pool(self.db_name)
+        self.conn = self.pool.acquire()
         self.cursor = self.conn.cursor()
         return self.cursor
-    """The end of the 'with' block to close the database connection."""
+    """The end of the 'with' block: commit on success, roll back on error, then return the connection."""
     def __exit__(self, exc_type, exc_val, exc_tb):
         print("Closing database connection...")
         if self.conn:
-            self.conn.commit()
-            self.conn.close()
+            try:
+                self.cursor.close()
+                if exc_type is None:
+                    self.conn.commit()
+                else:
+                    self.conn.rollback()
+            finally:
+                self.pool.release(self.conn)
+                self.conn = None
+                self.cursor = None
+        return False  # exceptions from the block are not swallowed
 
 # ==== Usage ====
 
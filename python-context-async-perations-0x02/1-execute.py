@@ -1,13 +1,38 @@
 import sqlite3
+from collections import namedtuple
+from functools import lru_cache
+
+
+@lru_cache(maxsize=128)
+def _row_class(columns):
+    """One named tuple class per distinct column list, built once, not per row."""
+    return namedtuple('Row', columns, rename=True)
+
+
+def namedtuple_factory(cursor, row):
+    """Row factory that returns rows as named tuples (row.name, row.age, ...)."""
+    return _row_class(tuple(column[0] for column in cursor.description))(*row)
+
 
 class ExecuteQuery:
     """A context manager for executing a query on an SQLite database."""
 
-    """Initializes the ExecuteQuery with the database name, query, and parameters."""
-    def __init__(self, db_name, query, params=()):
+    """
+    Initializes the ExecuteQuery with the database name, query, and parameters.
+
+    With `stream=True` the 'with' block gets a lazy iterator that reads
+    `arraysize` rows at a time instead of the full result list, so only one
+    batch is in memory however many rows the query returns. `row_factory`
+    is an sqlite3 row factory for the output rows, e.g. sqlite3.Row or
+    namedtuple_factory.
+    """
+    def __init__(self, db_name, query, params=(), stream=False, arraysize=1000, row_factory=None):
         self.db_name = db_name
         self.query = query
         self.params = params
+        self.stream = stream
+        self.arraysize = arraysize
+        self.row_factory = row_factory
         self.conn = None
         self.cursor = None
         self.result = None
@@ -17,21 +42,42 @@ class ExecuteQuery:
         print("Opening connection and executing query...")
         self.conn = sqlite3.connect(self.db_name)
         self.cursor = self.conn.cursor()
+        self.cursor.arraysize = self.arraysize
+        if self.row_factory is not None:
+            self.cursor.row_factory = self.row_factory
         self.cursor.execute(self.query, self.params)
-        self.result = self.cursor.fetchall()
+        if self.stream:
+            self.result = self._rows()
+        else:
+            self.result = self.cursor.fetchall()
         return self.result
 
+    """Yields the rows one batch of `arraysize` at a time while the block is open."""
+    def _rows(self):
+        while self.cursor is not None:
+            rows = self.cursor.fetchmany()
+            if not rows:
+                return
+            for row in rows:
+                if self.cursor is None:
+                    break
+                yield row
+        raise RuntimeError("Streamed rows can only be read inside the 'with' block")
+
     """The end of the 'with' block to close the database connection."""
     def __exit__(self, exc_type, exc_val, exc_tb):
         print("Closing connection...")
+        if self.cursor:
+            self.cursor.close()  # stops a streamed query that was not read to the end
+            self.cursor = None
         if self.conn:
             self.conn.commit()
             self.conn.close()
 
-# Using the context manager to fetch users older than 25
+# Using the context manager to stream users older than 25, 1000 rows at a time
 query = "SELECT * FROM users WHERE age > ?"
 params = (25,)
 
-with ExecuteQuery("Alx_prodev.db", query, params) as results:
+with ExecuteQuery("Alx_prodev.db", query, params, stream=True, row_factory=namedtuple_factory) as results:
     for row in results:
         print(row)
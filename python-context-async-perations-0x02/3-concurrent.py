@@ -1,32 +1,49 @@
 import asyncio
 import aiosqlite
 
-# Async function to fetch all users
-async def async_fetch_users():
+from db_pool import ReaderPool
+
+# Fetches rows over aiosqlite, or on the reader pool when one is given
+async def _fetch(query, params=(), readers=None):
+    if readers is not None:
+        return await readers.fetch(query, params)
     async with aiosqlite.connect("ALX_prodev.db") as db:
-        async with db.execute("SELECT * FROM users") as cursor:
-            users = await cursor.fetchall()
-            print("\nAll Users:")
-            for user in users:
-                print(user)
-            return users
+        async with db.execute(query, params) as cursor:
+            return await cursor.fetchall()
+
+# Async function to fetch all users
+async def async_fetch_users(readers=None):
+    users = await _fetch("SELECT * FROM users", readers=readers)
+    print("\nAll Users:")
+    for user in users:
+        print(user)
+    return users
 
 # Async function to fetch users older than 40
-async def async_fetch_older_users():
-    async with aiosqlite.connect("ALX_prodev.db") as db:
-        async with db.execute("SELECT * FROM users WHERE age > ?", (40,)) as cursor:
-            older_users = await cursor.fetchall()
-            print("\nUsers older than 40:")
-            for user in older_users:
-                print(user)
-            return older_users
+async def async_fetch_older_users(readers=None):
+    older_users = await _fetch("SELECT * FROM users WHERE age > ?", (40,), readers=readers)
+    print("\nUsers older than 40:")
+    for user in older_users:
+        print(user)
+    return older_users
 
 # Function to run both queries concurrently
-async def fetch_concurrently():
-    await asyncio.gather(
-        async_fetch_users(),
-        async_fetch_older_users()
-    )
+async def fetch_concurrently(reader_count=0):
+    """
+    Runs both queries at once. Each aiosqlite connection runs its queries
+    on a single thread; with `reader_count` > 0 they go to that many
+    read-only WAL connections instead and really execute in parallel.
+    """
+    if not reader_count:
+        return await asyncio.gather(
+            async_fetch_users(),
+            async_fetch_older_users()
+        )
+    with ReaderPool("ALX_prodev.db", readers=reader_count) as readers:
+        return await asyncio.gather(
+            async_fetch_users(readers),
+            async_fetch_older_users(readers)
+        )
 
 # Run the asynchronous tasks
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import namedtuple
+
+from async_db_pool import AsyncSQLitePool
+
+# One finished query; `error` is set instead of `rows` when it failed or timed out
+QueryResult = namedtuple('QueryResult', 'index query params rows error elapsed')
+
+
+class QueryExecutor:
+    """
+    Runs many queries with at most `concurrency` of them in flight.
+
+    Queries run on the executor's own pool of `concurrency` aiosqlite
+    connections, used from one event loop and closed by close(). Each one
+    can have a timeout (`timeout` seconds by default, None for no limit);
+    a query that times out or is cancelled is interrupted in SQLite, so it
+    stops using a connection and a CPU as well.
+    """
+
+    def __init__(self, database='ALX_prodev.db', concurrency=4, timeout=None):
+        self.database = database
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self._pool = AsyncSQLitePool(database, size=concurrency)
+        self._tasks = set()
+
+    async def run(self, query, params=(), timeout=None):
+        """Runs one query within the concurrency limit and returns its rows."""
+        timeout = self.timeout if timeout is None else timeout
+        async with self._slots:
+            conn = await self._pool.acquire()
+            try:
+                return await asyncio.wait_for(self._fetch(conn, query, params), timeout)
+            except asyncio.TimeoutError:
+                await conn.interrupt()  # the query keeps running in SQLite otherwise
+                raise TimeoutError(f"Query timed out after {timeout}s") from None
+            except asyncio.CancelledError:
+                await conn.interrupt()
+                raise
+            finally:
+                await self._pool.release(conn)
+
+    async def _fetch(self, conn, query, params):
+        async with conn.execute(query, params) as cursor:
+            return await cursor.fetchall()
+
+    def submit(self, query, params=(), timeout=None):
+        """Schedules a query and returns its task; close() cancels the unfinished ones."""
+        task = asyncio.ensure_future(self.run(query, params, timeout))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run_one(self, index, query, params, timeout):
+        started = time.perf_counter()
+        try:
+            rows, error = await self.run(query, params, timeout), None
+        except Exception as e:
+            rows, error = None, e
+        return QueryResult(index, query, params, rows, error, time.perf_counter() - started)
+
+    async def as_completed(self, queries, timeout=None):
+        """
+        Async generator that runs `queries` (SQL strings or (query, params)
+        pairs) and yields a QueryResult for each as soon as it finishes.
+
+        A failing query is reported in its result and does not stop the
+        others. Leaving the loop early cancels the queries not yet done.
+        """
+        tasks = []
+        for index, item in enumerate(queries):
+            query, params = (item, ()) if isinstance(item, str) else item
+            tasks.append(asyncio.ensure_future(self._run_one(index, query, params, timeout)))
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self):
+        """Cancels submitted queries still running and closes the executor's connections."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._pool.close()
+
+
+# Report queries: how many users are older than each age
+async def fetch_age_report():
+    executor = QueryExecutor("ALX_prodev.db", concurrency=4, timeout=5)
+    queries = [("SELECT ?, COUNT(*) FROM users WHERE age > ?", (age, age)) for age in range(20, 100, 5)]
+    try:
+        async for result in executor.as_completed(queries):
+            if result.error is not None:
+                print(f"Query {result.index} failed: {result.error}")
+            else:
+                age, count = result.rows[0]
+                print(f"Users older than {age}: {count} ({result.elapsed * 1000:.1f} ms)")
+    finally:
+        await executor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(fetch_age_report())
@@ -0,0 +1,102 @@
+import asyncio
+import csv
+from contextlib import aclosing
+
+from async_db_pool import get_async_pool
+
+
+async def stream_batches(query, params=(), batch=500, database="ALX_prodev.db"):
+    """
+    Async generator that yields the query's rows in lists of up to `batch`.
+
+    The next batch is read while the current one is being consumed, and no
+    further: at most two batches are in memory, however slow the consumer.
+    When the consumer stops early, is cancelled or fails, a read still in
+    flight is interrupted, the cursor is closed and the connection goes
+    back to the pool.
+    """
+    pool = get_async_pool(database)
+    conn = await pool.acquire()
+    cursor = None
+    pending = None
+    try:
+        cursor = await conn.execute(query, params)
+        pending = asyncio.ensure_future(cursor.fetchmany(batch))
+        while pending is not None:
+            rows = await pending
+            pending = None
+            if not rows:
+                break
+            if len(rows) == batch:  # a short batch was the last one
+                pending = asyncio.ensure_future(cursor.fetchmany(batch))
+            yield rows
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await conn.interrupt()  # stop SQLite producing rows nobody will read
+        if cursor is not None:
+            await cursor.close()
+        await pool.release(conn)
+
+
+async def stream(query, params=(), batch=500, database="ALX_prodev.db"):
+    """
+    Async generator that yields the query's rows one at a time, reading
+    them `batch` rows at a time.
+
+        async for row in stream("SELECT * FROM users WHERE age > ?", (25,)):
+            ...
+
+    After a `break` the stream is closed on the event loop's next turn; use
+    `async with contextlib.aclosing(stream(...)) as rows:` to have the
+    cursor closed before the next statement runs.
+    """
+    async with aclosing(stream_batches(query, params, batch, database)) as batches:
+        async for rows in batches:
+            for row in rows:
+                yield row
+
+
+async def stream_to(sink, query, params=(), batch=500, database="ALX_prodev.db"):
+    """
+    Hands the query's rows to `sink`, an async callable that is awaited
+    with each list of up to `batch` rows (a file writer, an HTTP response).
+    The next batch is not handed over until the sink returns, so a slow
+    sink holds back the query instead of rows piling up in memory.
+    Returns the number of rows written.
+    """
+    count = 0
+    async with aclosing(stream_batches(query, params, batch, database)) as batches:
+        async for rows in batches:
+            await sink(rows)
+            count += len(rows)
+    return count
+
+
+def csv_sink(file):
+    """An async sink writing rows to an open text file as CSV, off the event loop."""
+    writer = csv.writer(file)
+
+    async def write(rows):
+        await asyncio.to_thread(writer.writerows, rows)
+    return write
+
+
+async def main():
+    #### Print the first ten users older than 25; the rest are never read
+    printed = 0
+    async for row in stream("SELECT * FROM users WHERE age > ?", (25,), batch=100):
+        print(row)
+        printed += 1
+        if printed == 10:
+            break
+
+    #### Export every user to CSV, one batch in memory at a time
+    with open("users.csv", mode="w", newline="", encoding="utf-8") as file:
+        count = await stream_to(csv_sink(file), "SELECT * FROM users", batch=1000)
+    print(f"Wrote {count} users to users.csv")
+    await get_async_pool("ALX_prodev.db").close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+"""
+Measures read throughput against the number of read-only readers.
+
+Usage: ./benchmark_readers.py [--rows N] [--queries N] [--readers 1,2,4,8]
+
+A users table of --rows generated rows is written to a temporary file.
+The same --queries aggregate scans are then run over one aiosqlite
+connection (the 3-concurrent.py default) and over ReaderPools of each
+size, and queries/s plus the speed-up over one reader are reported.
+Readers can only scale up to the number of cores.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import aiosqlite
+
+from db_pool import ReaderPool
+
+# A full scan with enough per-row work that SQLite, not Python, dominates
+QUERY = "SELECT COUNT(*), AVG(age), SUM(LENGTH(email)) FROM users WHERE age > ? AND name LIKE ?"
+
+
+def create_users(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                 "email TEXT NOT NULL, age INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO users (id, name, email, age) VALUES (?, ?, ?, ?)",
+                     ((i, f"user {i}", f"user{i}@example.com", random.randint(18, 90))
+                      for i in range(1, rows + 1)))
+    conn.commit()
+    conn.close()
+
+
+def query_params(count):
+    return [(random.randint(18, 80), f"%{random.randint(0, 9)}%") for _ in range(count)]
+
+
+async def run_aiosqlite(path, params):
+    """All queries gathered at once over one aiosqlite connection."""
+    async with aiosqlite.connect(path) as db:
+        async def one(args):
+            async with db.execute(QUERY, args) as cursor:
+                return await cursor.fetchall()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(args) for args in params))
+        return time.perf_counter() - started
+
+
+def run_readers(path, readers, params):
+    with ReaderPool(path, readers=readers) as pool:
+        pool.run("SELECT 1")  # open the first reader before the clock starts
+        started = time.perf_counter()
+        for future in [pool.submit(QUERY, args) for args in params]:
+            future.result()
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reader pool throughput benchmark")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=64)
+    parser.add_argument('--readers', default='1,2,4,8')
+    args = parser.parse_args()
+    reader_counts = [int(count) for count in args.readers.split(',')]
+
+    print(f"rows: {args.rows}, queries: {args.queries}, cores: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'users.db')
+        create_users(path, args.rows)
+        params = query_params(args.queries)
+
+        print(f"{'mode':>20} {'queries/s':>12} {'speed-up':>9}")
+        elapsed = asyncio.run(run_aiosqlite(path, params))
+        print(f"{'aiosqlite (1 conn)':>20} {len(params) / elapsed:>12,.1f} {'-':>9}")
+        single = None
+        for readers in reader_counts:
+            elapsed = run_readers(path, readers, params)
+            single = single or elapsed
+            print(f"{f'{readers} readers':>20} {len(params) / elapsed:>12,.1f} {single / elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
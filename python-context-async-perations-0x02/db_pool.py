@@ -0,0 +1,235 @@
+"""
+Connection pools for the context managers in this directory.
+
+SQLitePool and get_pool() are adapted from python-decorators-0x01/db_pool.py,
+keeping only what is used here (no URI databases, no configure_pool());
+ReaderPool is specific to this directory.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+# Applied once when a connection is opened, not on every checkout
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers no longer block on the writer
+    'synchronous': 'NORMAL',  # fsync at checkpoints rather than every commit (safe with WAL)
+    'cache_size': -16000,  # 16 MB page cache per connection
+    'busy_timeout': 5000,  # wait up to 5s for locks instead of failing at once
+}
+
+
+class SQLitePool:
+    """
+    A thread-safe pool of SQLite connections to one database file.
+
+    Each thread is handed back the connection it used last whenever that
+    one is idle, which keeps its page and statement caches warm. At most
+    `size` connections are open; further callers wait up to `timeout`
+    seconds. Connections are checked with a trivial query on checkout and
+    replaced when they fail. Each connection keeps up to
+    `statement_cache_size` prepared statements (sqlite3's per-connection
+    statement cache, keyed on the SQL text), so repeated queries skip
+    re-parsing as long as their text is stable.
+    """
+
+    def __init__(self, database, size=5, timeout=30, pragmas=None, health_check=True,
+                 statement_cache_size=256):
+        self.database = database
+        self.size = size
+        self.statement_cache_size = statement_cache_size
+        self.timeout = timeout
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.health_check = health_check
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stats = {'checkouts': 0, 'waits': 0, 'created': 0, 'discarded': 0}
+
+    def _connect(self):
+        # Connections may move between threads, never used by two at once
+        conn = sqlite3.connect(self.database, check_same_thread=False,
+                               cached_statements=self.statement_cache_size)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    def _healthy(self, conn):
+        if not self.health_check:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self, timeout=None):
+        """Checks out a connection; raises TimeoutError if none frees up in time."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            conn = None
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No connection to {self.database} within {timeout}s")
+                    self._stats['waits'] += 1
+                    self._cond.wait(remaining)
+                if self._idle:
+                    preferred = getattr(self._local, 'conn', None)
+                    if preferred is not None and preferred in self._idle:
+                        self._idle.remove(preferred)
+                        conn = preferred
+                    else:
+                        conn = self._idle.pop()
+                else:
+                    self._open += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except sqlite3.Error:
+                    self._discard(None)
+                    raise
+            elif not self._healthy(conn):
+                self._discard(conn)
+                continue
+
+            self._local.conn = conn
+            with self._cond:
+                self._stats['checkouts'] += 1
+            return conn
+
+    def release(self, conn):
+        """Returns a connection, rolling back anything left uncommitted."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        with self._cond:
+            self._open -= 1
+            self._stats['discarded'] += conn is not None
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._open - len(self._idle)
+        return stats
+
+    def close(self):
+        """Closes the idle connections."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+# Read-only connections cannot change the journal mode; ReaderPool sets WAL up front
+READER_PRAGMAS = {
+    'query_only': 'ON',  # refuse writes even if the file is opened read-write elsewhere
+    'cache_size': -16000,
+    'busy_timeout': 5000,
+    'mmap_size': 268435456,  # read pages through a 256 MB memory map, no copies
+}
+
+
+class ReaderPool:
+    """
+    Runs read queries in parallel on several read-only connections.
+
+    Each of the `readers` worker threads owns one connection opened with a
+    `mode=ro` URI and `PRAGMA query_only`. sqlite3 releases the GIL while
+    SQLite executes a statement, so the readers really run side by side
+    on a multi-core host. The database is switched to WAL first, so the
+    readers neither block nor get blocked by a writer.
+    """
+
+    def __init__(self, database, readers=4, pragmas=None):
+        self.database = database
+        self.readers = readers
+        self.pragmas = READER_PRAGMAS if pragmas is None else pragmas
+        self._uri = f"file:{quote(os.path.abspath(database))}?mode=ro"
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._enable_wal()
+        self._executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='sqlite-reader',
+                                            initializer=self._open_reader)
+
+    def _enable_wal(self):
+        conn = sqlite3.connect(self.database)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")  # persistent, stored in the file
+        finally:
+            conn.close()
+
+    def _open_reader(self):
+        conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        self._local.conn = conn
+        with self._connections_lock:
+            self._connections.append(conn)
+
+    def _run(self, query, params):
+        return self._local.conn.execute(query, params).fetchall()
+
+    def submit(self, query, params=()):
+        """Queues a query on the next free reader; returns a concurrent.futures.Future."""
+        return self._executor.submit(self._run, query, params)
+
+    def run(self, query, params=()):
+        return self.submit(query, params).result()
+
+    async def fetch(self, query, params=()):
+        """Awaits a query's rows without tying up the event loop."""
+        return await asyncio.wrap_future(self.submit(query, params))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database='ALX_prodev.db'):
+    """Returns the shared pool for `database`, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = _pools[database] = SQLitePool(database)
+        return pool
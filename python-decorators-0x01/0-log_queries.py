@@ -1,27 +1,206 @@
 import sqlite3
 import functools
+import atexit
+import bisect
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import threading
+import time
 from datetime import datetime
 
+from result_cache import normalize_sql
+
 #### decorator to lof SQL queries
 
 """ Decorator to log SQL queries executed by a function."""
 
-def log_queries(func):
-   @functools.wraps(func)
-   def wrapper(*args, **kwargs):
-      # Check if 'query' is in kwargs or args
-      query = None
-      # If 'query' is in kwargs, use it; otherwise, check args  
-      if 'query' in kwargs:
-            query = kwargs['query']
-      elif args:
-         query = args[0]
-
-      print(f"Executing query: {query}")
-      return func(*args, **kwargs)
-   return wrapper  
-
-@log_queries
+query_logger = logging.getLogger('queries')
+
+# Latency histogram bucket upper bounds in ms: 0.05ms doubling up to ~26s
+LATENCY_BUCKETS = [0.05 * 2 ** i for i in range(20)]
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+_listener = None
+_listener_lock = threading.Lock()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """
+    Normalized SQL with literals replaced by ?, so similar queries group
+    together. Cached, since a program runs the same few statements over
+    and over.
+    """
+    return _LITERALS.sub('?', normalize_sql(query))
+
+
+class JsonRecordFormatter(logging.Formatter):
+    """Renders the structured query record as one JSON line."""
+
+    def format(self, record):
+        payload = getattr(record, 'query_record', None)
+        if payload is None:
+            return super().format(record)
+        return json.dumps(payload, default=str)
+
+
+def start_query_logging(handler=None):
+    """
+    Routes query records through a queue to a background listener thread,
+    so the decorated call only pays for an enqueue. By default records go
+    to stderr as JSON lines; pass any logging handler to send them elsewhere.
+    """
+    global _listener
+    if _listener is not None:
+        return  # already running; no lock on the per-call path
+    with _listener_lock:
+        if _listener is not None:
+            return
+        if handler is None:
+            handler = logging.StreamHandler()
+        handler.setFormatter(JsonRecordFormatter())
+        log_queue = queue.SimpleQueue()
+        query_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        query_logger.setLevel(logging.INFO)
+        query_logger.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, handler)
+        _listener.start()
+        atexit.register(stop_query_logging)
+
+
+def stop_query_logging():
+    """Flushes pending records and stops the listener thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in list(query_logger.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                query_logger.removeHandler(handler)
+        _listener = None
+
+
+def _record_latency(key, duration_ms, failed):
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = {
+                'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        stats['count'] += 1
+        stats['errors'] += failed
+        stats['total_ms'] += duration_ms
+        stats['max_ms'] = max(stats['max_ms'], duration_ms)
+        stats['buckets'][bisect.bisect_left(LATENCY_BUCKETS, duration_ms)] += 1
+
+
+def _histogram_percentile(buckets, count, q):
+    """Upper bound of the histogram bucket holding the q-th quantile."""
+    rank = q * count
+    cumulative = 0
+    for i, hits in enumerate(buckets):
+        cumulative += hits
+        if hits and cumulative >= rank:
+            return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float('inf')
+    return None
+
+
+def dump_query_stats(sort_by='total_ms'):
+    """
+    Returns per-fingerprint latency stats (count, errors, mean/p50/p95/p99
+    and max in ms, plus the raw histogram), hottest first.
+    """
+    with _stats_lock:
+        snapshot = {key: dict(stats, buckets=list(stats['buckets'])) for key, stats in _stats.items()}
+    report = []
+    for key, stats in snapshot.items():
+        count = stats['count']
+        report.append({
+            'fingerprint': key,
+            'count': count,
+            'errors': stats['errors'],
+            'total_ms': stats['total_ms'],
+            'mean_ms': stats['total_ms'] / count,
+            'p50_ms': _histogram_percentile(stats['buckets'], count, 0.50),
+            'p95_ms': _histogram_percentile(stats['buckets'], count, 0.95),
+            'p99_ms': _histogram_percentile(stats['buckets'], count, 0.99),
+            'max_ms': stats['max_ms'],
+            'buckets': dict(zip(LATENCY_BUCKETS + [float('inf')], stats['buckets'])),
+        })
+    report.sort(key=lambda entry: entry[sort_by], reverse=True)
+    return report
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def log_queries(func=None, *, sample_rate=0.01, slow_ms=100.0):
+    """
+    Times each call and records its query fingerprint, params, duration,
+    row count and error.
+
+    Every call feeds the per-fingerprint histograms behind
+    dump_query_stats(). Structured records are emitted for a `sample_rate`
+    fraction of calls (1% by default; pass 1.0 to log every call), and
+    always for errors and calls slower than `slow_ms` (logged at WARNING).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Check if 'query' is in kwargs or args
+            query = None
+            # If 'query' is in kwargs, use it; otherwise, check args
+            if 'query' in kwargs:
+                query = kwargs['query']
+            elif args:
+                query = args[0]
+            params = kwargs.get('params', args[1] if len(args) > 1 else None)
+
+            error = None
+            result = None
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                key = fingerprint(query) if isinstance(query, str) else repr(query)
+                _record_latency(key, duration_ms, error is not None)
+
+                slow = duration_ms >= slow_ms
+                if error is not None or slow or random.random() < sample_rate:
+                    start_query_logging()
+                    level = logging.WARNING if error is not None or slow else logging.INFO
+                    query_logger.log(level, 'query', extra={'query_record': {
+                        'ts': datetime.now().isoformat(),
+                        'function': func.__qualname__,
+                        'fingerprint': key,
+                        'params': params,
+                        'duration_ms': round(duration_ms, 3),
+                        'rows': len(result) if isinstance(result, list) else None,
+                        'slow': slow,
+                        'error': repr(error) if error is not None else None,
+                    }})
+        return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+@log_queries(sample_rate=1.0)  # log every call in this demo
 def fetch_all_users(query):
     conn = sqlite3.connect('users.db')
     cursor = conn.cursor()
@@ -31,4 +210,5 @@ def fetch_all_users(query):
     return results
 
 #### fetch users while logging the query
-users = fetch_all_users(query="SELECT * FROM users")
+if __name__ == "__main__":
+    users = fetch_all_users(query="SELECT * FROM users")
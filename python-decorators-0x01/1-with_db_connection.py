@@ -2,11 +2,14 @@ import sqlite3
 import functools
 from datetime import datetime
 
+from db_pool import get_pool
+
 # Decorator to handle database connection
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')  # Open the database connection
+        pool = get_pool('users.db')
+        conn = pool.acquire()  # Borrow a warm connection from the pool
         try:
             result = func(conn, *args, **kwargs)
             conn.commit()
@@ -15,7 +18,7 @@ def with_db_connection(func):
             print(f"[LOG] An error occurred: {e}")
             conn.rollback()
         finally:
-            conn.close() # Close the connection
+            pool.release(conn) # Return the connection to the pool
     return wrapper
 
 @with_db_connection 
@@ -26,5 +29,6 @@ def get_user_by_id(conn, user_id):
  
 #### Fetch user by ID with automatic connection handling 
 
-user = get_user_by_id(user_id=1)
-print(user)
+if __name__ == "__main__":
+    user = get_user_by_id(user_id=1)
+    print(user)
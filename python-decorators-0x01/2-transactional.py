@@ -1,39 +1,221 @@
+import atexit
 import sqlite3 
 import functools
+import threading
+import time
 from datetime import datetime
 
+from db_pool import DEFAULT_PRAGMAS, get_pool
+from result_cache import invalidate_tables, table_written
+
 # Decorator to handle database connection
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')  # Open the database connection
+        pool = get_pool('users.db')
+        conn = pool.acquire()  # Borrow a warm connection from the pool
         try:
             result = func(conn, *args, **kwargs)
-            conn.commit()
+            if conn.in_transaction:  # @transactional has usually committed already
+                conn.commit()
             return result
         except Exception as e:
             print(f"[LOG] An error occurred: {e}")
             conn.rollback()
         finally:
-            conn.close() # Close the connection
+            pool.release(conn) # Return the connection to the pool
     return wrapper
 
+# Savepoint depth of the @transactional calls in progress, per connection
+_depths = {}
+_depths_lock = threading.Lock()
+
+
+def _enter(conn):
+    """Marks one more level of nesting on `conn`; returns the previous depth."""
+    with _depths_lock:
+        depth = _depths.get(id(conn), 0)
+        _depths[id(conn)] = depth + 1
+        return depth
+
+
+def _leave(conn):
+    with _depths_lock:
+        depth = _depths[id(conn)] - 1
+        if depth:
+            _depths[id(conn)] = depth
+        else:
+            del _depths[id(conn)]
+
+
 # Decorator to handle transactions
 def transactional(func):
+    """
+    Runs the function in a transaction and commits it on success.
+
+    When the connection is already inside a @transactional call (or a
+    CommitBatcher), the function runs in a SAVEPOINT instead: on error only
+    its own changes are rolled back and the outer transaction carries on,
+    and nothing is committed until the outermost call finishes.
+    """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         conn = args[0]  # Assuming the first argument is the connection
+        depth = _enter(conn)
         try:
-            result = func(*args, **kwargs)
-            conn.commit() # Commit the transaction if successful    
-            print("[LOG] Transaction committed.")
-            return result
-        except Exception as e:
-            print(f"[ERROR] An error occurred: {e}")
-            conn.rollback()
-        return None
+            if depth:
+                return _run_in_savepoint(conn, depth, func, args, kwargs)
+            return _run_outermost(conn, func, args, kwargs)
+        finally:
+            _leave(conn)
     return wrapper
 
+
+def _run_in_savepoint(conn, depth, func, args, kwargs):
+    savepoint = f"transactional_{depth}"
+    conn.execute(f"SAVEPOINT {savepoint}")
+    try:
+        result = func(*args, **kwargs)
+        conn.execute(f"RELEASE {savepoint}")
+        return result
+    except Exception as e:
+        print(f"[ERROR] An error occurred: {e}")
+        conn.execute(f"ROLLBACK TO {savepoint}")
+        conn.execute(f"RELEASE {savepoint}")
+    return None
+
+
+def _run_outermost(conn, func, args, kwargs):
+    written = set()
+
+    def record_write(statement):
+        table = table_written(statement)
+        if table:
+            written.add(table)
+
+    conn.set_trace_callback(record_write)  # see which tables the function writes
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")  # one transaction for the call and everything nested in it
+        result = func(*args, **kwargs)
+        conn.commit() # Commit the transaction if successful    
+        print("[LOG] Transaction committed.")
+        invalidate_tables(written)  # cached reads of those tables are now stale
+        return result
+    except Exception as e:
+        print(f"[ERROR] An error occurred: {e}")
+        conn.rollback()
+    finally:
+        conn.set_trace_callback(None)
+    return None
+
+
+class CommitBatcher:
+    """
+    Groups many small writes into one commit.
+
+    Decorating a function with a CommitBatcher instance (in place of
+    @with_db_connection) runs it on the batcher's single writer connection,
+    inside a savepoint of a long-lived transaction. That transaction is
+    committed once `max_writes` calls have succeeded or `max_delay_ms` has
+    passed since the first uncommitted one, so one fsync covers the whole
+    group. SQLite allows only one writer at a time anyway, so funnelling
+    writes through one connection costs no concurrency.
+
+    A call that returns has not been made durable yet; use flush() when a
+    write must be on disk before moving on. Pending writes are flushed at
+    interpreter exit.
+    """
+
+    def __init__(self, database='users.db', max_writes=100, max_delay_ms=50, pragmas=None):
+        self.max_writes = max_writes
+        self.max_delay = max_delay_ms / 1000
+        self.conn = sqlite3.connect(database, check_same_thread=False)
+        for name, value in (DEFAULT_PRAGMAS if pragmas is None else pragmas).items():
+            self.conn.execute(f"PRAGMA {name} = {value}")
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._first_pending_at = None
+        self._written = set()
+        self._stats = {'writes': 0, 'commits': 0, 'failed_writes': 0, 'failed_commits': 0}
+        self.conn.set_trace_callback(self._record_write)
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_when_due, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _record_write(self, statement):
+        table = table_written(statement)
+        if table:
+            self._written.add(table)
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self._lock:
+                if not self.conn.in_transaction:
+                    self.conn.execute("BEGIN")
+                _enter(self.conn)  # nested @transactional calls become savepoints
+                self.conn.execute("SAVEPOINT batched_write")
+                try:
+                    result = func(self.conn, *args, **kwargs)
+                    self.conn.execute("RELEASE batched_write")
+                except Exception as e:
+                    print(f"[LOG] An error occurred: {e}")
+                    self.conn.execute("ROLLBACK TO batched_write")
+                    self.conn.execute("RELEASE batched_write")
+                    self._stats['failed_writes'] += 1
+                    return None
+                finally:
+                    _leave(self.conn)
+                self._pending += 1
+                self._stats['writes'] += 1
+                if self._first_pending_at is None:
+                    self._first_pending_at = time.monotonic()
+                if self._pending >= self.max_writes:
+                    self.flush()
+                return result
+        return wrapper
+
+    def flush(self):
+        """Commits every pending write now."""
+        with self._lock:
+            if self.conn.in_transaction:
+                self.conn.commit()
+                self._stats['commits'] += 1
+            written, self._written = self._written, set()
+            self._pending = 0
+            self._first_pending_at = None
+        invalidate_tables(written)
+
+    def _flush_when_due(self):
+        while not self._stop.wait(self.max_delay / 2):
+            first = self._first_pending_at
+            if first is not None and time.monotonic() - first >= self.max_delay:
+                try:
+                    self.flush()
+                except sqlite3.Error as e:
+                    # e.g. 'database is locked' during a checkpoint; the writes
+                    # stay pending and the next tick tries the commit again
+                    print(f"[LOG] Background commit failed: {e}")
+                    with self._lock:
+                        self._stats['failed_commits'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, pending=self._pending)
+        stats['writes_per_commit'] = stats['writes'] / stats['commits'] if stats['commits'] else 0.0
+        return stats
+
+    def close(self):
+        """Flushes pending writes and closes the writer connection."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
+        self.conn.close()
+
 @with_db_connection
 @transactional 
 def update_user_email(conn, user_id, new_email): 
@@ -41,4 +223,5 @@ def update_user_email(conn, user_id, new_email):
     cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id)) 
 #### Update user's email with automatic transaction handling 
 
-update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+if __name__ == "__main__":
+    update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
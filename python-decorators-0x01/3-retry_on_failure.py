@@ -1,13 +1,18 @@
 import time
+import random
+import asyncio
 import sqlite3 
 import functools
 from datetime import datetime
 
+from db_pool import get_pool
+
 # Decorator to handle database connection
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')  # Open the database connection
+        pool = get_pool('users.db')
+        conn = pool.acquire()  # Borrow a warm connection from the pool
         try:
             result = func(conn, *args, **kwargs)
             conn.commit()
@@ -16,23 +21,90 @@ def with_db_connection(func):
             print(f"[LOG] An error occurred: {e}")
             conn.rollback()
         finally:
-            conn.close() # Close the connection
+            pool.release(conn) # Return the connection to the pool
     return wrapper
 
+# Errors that clear up on their own when SQLite lock holders finish.
+# 'disk I/O error' is left out: a full disk, failing media or bad permissions
+# do not go away by waiting, and retrying would only hide the real fault.
+TRANSIENT_SQLITE_MESSAGES = (
+    'database is locked',
+    'database table is locked',
+    'database is busy',
+)
+
+
+def is_transient(error):
+    """Decides whether an error is worth retrying (locks, dropped connections)."""
+    if isinstance(error, sqlite3.OperationalError):
+        message = str(error).lower()
+        return any(text in message for text in TRANSIENT_SQLITE_MESSAGES)
+    return isinstance(error, (ConnectionResetError, ConnectionAbortedError,
+                              BrokenPipeError, TimeoutError))
+
+
+class RetryError(Exception):
+    """Raised once retries are exhausted; the last failure is its __cause__."""
+
+
+def backoff_delay(attempt, delay, max_delay):
+    """Full-jitter exponential backoff: uniform in [0, min(max_delay, delay * 2**attempt)]."""
+    return random.uniform(0, min(max_delay, delay * 2 ** attempt))
+
+
 # Decorator to handle retries on failure
-def retry_on_failure(retries=3, delay=1):
+def retry_on_failure(retries=3, delay=1, max_delay=30, deadline=None, retry_if=is_transient):
+    """
+    Retries transient failures with exponential backoff and full jitter.
+
+    `retries` is the total number of attempts and `delay` the base backoff
+    in seconds, capped at `max_delay`; `deadline` bounds the total time
+    spent, sleeps included. Errors for which `retry_if` is false propagate
+    immediately. Coroutine functions are retried with asyncio.sleep.
+    """
+    if retries < 1:
+        raise ValueError("retries must be at least 1")
+
+    def next_pause(error, attempt, started):
+        """Returns the sleep before the next attempt, or None to give up."""
+        print(f"[LOG] Attempt {attempt + 1} failed: {error}")
+        if attempt >= retries - 1:
+            return None
+        pause = backoff_delay(attempt, delay, max_delay)
+        if deadline is not None and time.monotonic() - started + pause > deadline:
+            return None
+        return pause
+
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.monotonic()
+                for attempt in range(retries):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        if not retry_if(e):
+                            raise
+                        pause = next_pause(e, attempt, started)
+                        if pause is None:
+                            raise RetryError(f"{func.__name__} failed after {attempt + 1} attempts") from e
+                    await asyncio.sleep(pause)
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            started = time.monotonic()
             for attempt in range(retries):
                 try:
-                    print(f"[LOG] Attempt {attempt}...")
                     return func(*args, **kwargs)
                 except Exception as e:
-                    print(f"[LOG] Attempt {attempt + 1} failed: {e}")
-                    if attempt < retries - 1:
-                        time.sleep(delay)
-            raise Exception("All retry attempts failed.")
+                    if not retry_if(e):
+                        raise
+                    pause = next_pause(e, attempt, started)
+                    if pause is None:
+                        raise RetryError(f"{func.__name__} failed after {attempt + 1} attempts") from e
+                time.sleep(pause)
         return wrapper
     return decorator
 
@@ -46,5 +118,6 @@ def fetch_users_with_retry(conn):
 
 #### attempt to fetch users with automatic retry on failure
 
-users = fetch_users_with_retry()
-print(users)
+if __name__ == "__main__":
+    users = fetch_users_with_retry()
+    print(users)
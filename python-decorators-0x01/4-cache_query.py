@@ -1,15 +1,40 @@
+import os
 import time
 import sqlite3 
 import functools
 from datetime import datetime
 
-query_cache = {}
+from db_pool import get_pool
+from cache_backends import SQLiteCacheBackend
+from result_cache import QueryCache, make_key, tables_read
+
+# Bounded LRU with a 5 minute TTL; writes through @transactional invalidate it.
+# Expired entries are served for one more minute while a refresh runs.
+query_cache = QueryCache(max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300, stale_ttl=60)
+
+
+def configure_cache_backend(path=None, **options):
+    """
+    Puts an SQLiteCacheBackend behind query_cache, so results survive
+    restarts and are shared between the worker processes on this host.
+    `path` defaults to $QUERY_CACHE_FILE, then query_cache.db; `options`
+    go to SQLiteCacheBackend (max_bytes, pool_size). Returns the backend.
+    """
+    path = path or os.environ.get('QUERY_CACHE_FILE') or 'query_cache.db'
+    options.setdefault('max_bytes', 256 * 1024 * 1024)
+    return query_cache.set_backend(SQLiteCacheBackend(path, **options))
+
+
+# The disk tier is opt-in: set QUERY_CACHE_FILE or call configure_cache_backend()
+if os.environ.get('QUERY_CACHE_FILE'):
+    configure_cache_backend()
 
 # Decorator to handle database connection
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')  # Open the database connection
+        pool = get_pool('users.db')
+        conn = pool.acquire()  # Borrow a warm connection from the pool
         try:
             result = func(conn, *args, **kwargs)
             conn.commit()
@@ -18,23 +43,58 @@ def with_db_connection(func):
             print(f"[LOG] An error occurred: {e}")
             conn.rollback()
         finally:
-            conn.close() # Close the connection
+            pool.release(conn) # Return the connection to the pool
     return wrapper
 
 # Decorator to cache query results
-def cache_query(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        query = kwargs.get('query', args[0] if args else None)
-        if query in query_cache:
-            print("[LOG] Using cached result for query:", query)
-            return query_cache[query]
-        
-        print("[LOG] Executing query:", query)
-        result = func(*args, **kwargs)
-        query_cache[query] = result
-        return result
-    return wrapper
+def cache_query(func=None, *, cache=None, ttl=None, database='users.db'):
+    """
+    Caches results keyed on the database, the normalized SQL text and its
+    bound params.
+
+    Usable bare (@cache_query) or with options
+    (@cache_query(cache=my_cache, ttl=60)); results go to the module-level
+    query_cache unless another QueryCache is given. Concurrent misses for
+    the same query run it once. Stale entries are refreshed in the
+    background on a connection drawn from the `database` pool, since the
+    caller's connection goes back to the pool when its call returns.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            target = query_cache if cache is None else cache
+            # args[0] is the connection injected by with_db_connection
+            query = kwargs.get('query', args[1] if len(args) > 1 else None)
+            params = kwargs.get('params', args[2] if len(args) > 2 else ())
+            key = make_key(query, params, database) if query else None
+            if key is None:
+                return func(*args, **kwargs)
+
+            executed = False
+
+            def load():
+                nonlocal executed
+                executed = True
+                print("[LOG] Executing query:", query)
+                return func(*args, **kwargs)
+
+            def refresh():
+                pool = get_pool(database)
+                conn = pool.acquire()
+                try:
+                    return func(conn, *args[1:], **kwargs)
+                finally:
+                    pool.release(conn)
+
+            result = target.get_or_load(key, load, tables=tables_read(query),
+                                        ttl=ttl, refresh=refresh)
+            if not executed:
+                print("[LOG] Using cached result for query:", query)
+            return result
+        return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 @with_db_connection
 @cache_query
@@ -43,8 +103,9 @@ def fetch_users_with_cache(conn, query):
     cursor.execute(query)
     return cursor.fetchall()
 
-#### First call will cache the result
-users = fetch_users_with_cache(query="SELECT * FROM users")
+if __name__ == "__main__":
+    #### First call will cache the result
+    users = fetch_users_with_cache(query="SELECT * FROM users")
 
-#### Second call will use the cached result
-users_again = fetch_users_with_cache(query="SELECT * FROM users")
+    #### Second call will use the cached result
+    users_again = fetch_users_with_cache(query="SELECT * FROM users")
@@ -0,0 +1,235 @@
+import sqlite3
+import functools
+
+from db_pool import get_pool
+from result_cache import invalidate_tables, table_written
+
+# Keys per IN (...) query; stays below SQLite's default limit of 999 host parameters
+MAX_IN_PARAMS = 512
+
+# Decorator to handle database connection
+def with_db_connection(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        pool = get_pool('users.db')
+        conn = pool.acquire()  # Borrow a warm connection from the pool
+        try:
+            result = func(conn, *args, **kwargs)
+            conn.commit()
+            return result
+        except Exception as e:
+            print(f"[LOG] An error occurred: {e}")
+            conn.rollback()
+        finally:
+            pool.release(conn) # Return the connection to the pool
+    return wrapper
+
+
+def in_list_size(count):
+    """
+    Rounds an IN-list length up to a power of two, so lookups of 3, 4, 5 ...
+    keys share a handful of statement texts and hit the connection's
+    prepared-statement cache instead of being re-parsed.
+    """
+    size = 1
+    while size < count:
+        size *= 2
+    return min(size, MAX_IN_PARAMS)
+
+
+def fetch_by_keys(conn, table, key_column, keys, columns='*'):
+    """
+    Fetches the rows for many keys in one `WHERE key IN (...)` round trip
+    per MAX_IN_PARAMS keys. Returns {key: row}; missing keys are absent.
+    """
+    unique = list(dict.fromkeys(keys))
+    rows = {}
+    for start in range(0, len(unique), MAX_IN_PARAMS):
+        chunk = unique[start:start + MAX_IN_PARAMS]
+        size = in_list_size(len(chunk))
+        padded = chunk + [chunk[-1]] * (size - len(chunk))  # padding repeats a key, adds no rows
+        placeholders = ', '.join('?' * size)
+        cursor = conn.execute(
+            f"SELECT {columns} FROM {table} WHERE {key_column} IN ({placeholders})", padded)
+        names = [description[0] for description in cursor.description]
+        key_index = names.index(key_column)
+        for row in cursor:
+            rows[row[key_index]] = row
+    return rows
+
+
+class PendingResult:
+    """Placeholder for the result of a call queued in a batch."""
+
+    __slots__ = ('_value', '_done')
+
+    def __init__(self):
+        self._value = None
+        self._done = False
+
+    def set(self, value):
+        self._value = value
+        self._done = True
+
+    def result(self):
+        if not self._done:
+            raise RuntimeError("The batch has not been executed yet; leave its 'with' block first")
+        return self._value
+
+
+class LookupBatch:
+    """
+    Collects key lookups and resolves them with one IN query on exit.
+
+        with get_user_by_id.batch() as batch:
+            pending = [batch(user_id) for user_id in ids]
+        users = [p.result() for p in pending]
+    """
+
+    def __init__(self, table, key_column, columns, database):
+        self.table = table
+        self.key_column = key_column
+        self.columns = columns
+        self.database = database
+        self._calls = []
+
+    def __call__(self, key):
+        pending = PendingResult()
+        self._calls.append((key, pending))
+        return pending
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None or not self._calls:
+            return False
+        pool = get_pool(self.database)
+        conn = pool.acquire()
+        try:
+            rows = fetch_by_keys(conn, self.table, self.key_column,
+                                 [key for key, _ in self._calls], self.columns)
+        finally:
+            pool.release(conn)
+        for key, pending in self._calls:
+            pending.set(rows.get(key))
+        return False
+
+
+class WriteBatch:
+    """
+    Collects the parameters of many calls to one write statement and runs
+    them with a single executemany in one transaction on exit.
+    """
+
+    def __init__(self, statement, params, database):
+        self.statement = statement
+        self.params = params
+        self.database = database
+        self._rows = []
+
+    def __call__(self, *args, **kwargs):
+        self._rows.append(self.params(*args, **kwargs))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None or not self._rows:
+            return False
+        pool = get_pool(self.database)
+        conn = pool.acquire()
+        try:
+            conn.executemany(self.statement, self._rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.release(conn)
+        table = table_written(self.statement)
+        if table:
+            invalidate_tables([table])
+        print(f"[LOG] Batched {len(self._rows)} writes into one executemany.")
+        return False
+
+
+# Decorator to batch single-key lookups into IN (...) queries
+def batched_lookup(table, key_column='id', columns='*', database='users.db'):
+    """
+    Leaves the decorated single-row lookup unchanged and adds:
+
+    * `.batch()`: a LookupBatch that queues keys and fetches them all with
+      one query when its `with` block ends;
+    * `.many(keys)`: returns the rows for `keys` (None where missing), in
+      order, from the same kind of single query.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        def batch():
+            return LookupBatch(table, key_column, columns, database)
+
+        def many(keys):
+            pool = get_pool(database)
+            conn = pool.acquire()
+            try:
+                rows = fetch_by_keys(conn, table, key_column, keys, columns)
+            finally:
+                pool.release(conn)
+            return [rows.get(key) for key in keys]
+
+        wrapper.batch = batch
+        wrapper.many = many
+        return wrapper
+    return decorator
+
+
+# Decorator to batch single-row writes into one executemany
+def batched_write(statement, params, database='users.db'):
+    """
+    Adds `.batch()` to a single-row write: a WriteBatch that records each
+    call's parameters, turned into a tuple by `params(*args, **kwargs)`,
+    and runs them as one executemany when its `with` block ends.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        wrapper.batch = lambda: WriteBatch(statement, params, database)
+        return wrapper
+    return decorator
+
+
+@with_db_connection
+@batched_lookup('users', key_column='id')
+def get_user_by_id(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+
+
+@with_db_connection
+@batched_write("UPDATE users SET email = ? WHERE id = ?",
+               params=lambda user_id, new_email: (new_email, user_id))
+def update_user_email(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
+if __name__ == "__main__":
+    #### Fetch several users with one query instead of one query each
+    with get_user_by_id.batch() as batch:
+        pending = [batch(user_id) for user_id in (1, 2, 3)]
+    print([user.result() for user in pending])
+
+    #### Or, when all the keys are known up front
+    print(get_user_by_id.many([4, 5, 6]))
+
+    #### Update several emails with a single executemany
+    with update_user_email.batch() as batch:
+        batch(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+        batch(user_id=2, new_email='Kyle_Kuhic@hotmail.com')
@@ -0,0 +1,208 @@
+import asyncio
+import sqlite3
+import functools
+from datetime import datetime
+
+from async_db_pool import get_async_pool
+from result_cache import ainvalidate_tables, make_key, table_written, tables_read
+
+# The sync decorators these dispatch to for plain functions
+_sync_with_db_connection = __import__('2-transactional').with_db_connection
+_sync_transactional = __import__('2-transactional').transactional
+_sync_cache_query = __import__('4-cache_query').cache_query
+# One cache for sync and async callers, so either can reuse the other's results
+query_cache = __import__('4-cache_query').query_cache
+# Already async-aware: coroutines are retried with asyncio.sleep backoff
+retry_on_failure = __import__('3-retry_on_failure').retry_on_failure
+
+
+# Decorator to handle database connection
+def with_db_connection(func=None, *, database='users.db'):
+    """
+    Passes a pooled connection as the first argument. Coroutine functions
+    get an aiosqlite connection from the event loop's pool; plain functions
+    keep the sync behaviour.
+    """
+    def decorator(func):
+        if not asyncio.iscoroutinefunction(func):
+            return _sync_with_db_connection(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            pool = get_async_pool(database)
+            conn = await pool.acquire()  # Borrow a warm connection from the pool
+            try:
+                result = await func(conn, *args, **kwargs)
+                if conn.in_transaction:  # @transactional has usually committed already
+                    await conn.commit()
+                return result
+            except Exception as e:
+                print(f"[LOG] An error occurred: {e}")
+                await conn.rollback()
+            finally:
+                await pool.release(conn) # Return the connection to the pool
+        return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+# Savepoint depth of the async @transactional calls in progress, per connection
+_depths = {}
+
+
+def _enter(conn):
+    depth = _depths.get(id(conn), 0)
+    _depths[id(conn)] = depth + 1
+    return depth
+
+
+def _leave(conn):
+    depth = _depths[id(conn)] - 1
+    if depth:
+        _depths[id(conn)] = depth
+    else:
+        del _depths[id(conn)]
+
+
+# Decorator to handle transactions
+def transactional(func):
+    """
+    Runs the function in a transaction and commits it on success, with
+    nested calls on the same connection running in savepoints, as the sync
+    @transactional does. Cached results of the tables written are
+    invalidated on commit.
+    """
+    if not asyncio.iscoroutinefunction(func):
+        return _sync_transactional(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        conn = args[0]  # Assuming the first argument is the connection
+        depth = _enter(conn)
+        try:
+            if depth:
+                return await _run_in_savepoint(conn, depth, func, args, kwargs)
+            return await _run_outermost(conn, func, args, kwargs)
+        finally:
+            _leave(conn)
+    return wrapper
+
+
+async def _run_in_savepoint(conn, depth, func, args, kwargs):
+    savepoint = f"transactional_{depth}"
+    await conn.execute(f"SAVEPOINT {savepoint}")
+    try:
+        result = await func(*args, **kwargs)
+        await conn.execute(f"RELEASE {savepoint}")
+        return result
+    except Exception as e:
+        print(f"[ERROR] An error occurred: {e}")
+        await conn.execute(f"ROLLBACK TO {savepoint}")
+        await conn.execute(f"RELEASE {savepoint}")
+    return None
+
+
+async def _run_outermost(conn, func, args, kwargs):
+    written = set()
+
+    def record_write(statement):
+        table = table_written(statement)
+        if table:
+            written.add(table)
+
+    await conn.set_trace_callback(record_write)  # see which tables the function writes
+    try:
+        if not conn.in_transaction:
+            await conn.execute("BEGIN")
+        result = await func(*args, **kwargs)
+        await conn.commit()
+        print("[LOG] Transaction committed.")
+        await ainvalidate_tables(written)  # cached reads of those tables are now stale
+        return result
+    except Exception as e:
+        print(f"[ERROR] An error occurred: {e}")
+        await conn.rollback()
+    finally:
+        await conn.set_trace_callback(None)
+    return None
+
+
+# Decorator to cache query results
+def cache_query(func=None, *, cache=None, ttl=None, database='users.db'):
+    """
+    Caches results keyed on the database, normalized SQL text and params,
+    in the same query_cache the sync decorator uses. Concurrent misses on
+    one event loop await a single query; stale entries are served while a
+    background task refreshes them on a connection from the async pool.
+    """
+    def decorator(func):
+        if not asyncio.iscoroutinefunction(func):
+            return _sync_cache_query(func, cache=cache, ttl=ttl, database=database)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            target = query_cache if cache is None else cache
+            # args[0] is the connection injected by with_db_connection
+            query = kwargs.get('query', args[1] if len(args) > 1 else None)
+            params = kwargs.get('params', args[2] if len(args) > 2 else ())
+            key = make_key(query, params, database) if query else None
+            if key is None:
+                return await func(*args, **kwargs)
+
+            executed = False
+
+            async def load():
+                nonlocal executed
+                executed = True
+                print("[LOG] Executing query:", query)
+                return await func(*args, **kwargs)
+
+            async def refresh():
+                async with get_async_pool(database).connection() as conn:
+                    return await func(conn, *args[1:], **kwargs)
+
+            result = await target.aget_or_load(key, load, tables=tables_read(query),
+                                               ttl=ttl, refresh=refresh)
+            if not executed:
+                print("[LOG] Using cached result for query:", query)
+            return result
+        return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+@with_db_connection
+@retry_on_failure(retries=3, delay=1)
+async def get_user_by_id(conn, user_id):
+    async with conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)) as cursor:
+        return await cursor.fetchone()
+
+
+@with_db_connection
+@transactional
+async def update_user_email(conn, user_id, new_email):
+    await conn.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
+@with_db_connection
+@cache_query
+async def fetch_users_with_cache(conn, query):
+    async with conn.execute(query) as cursor:
+        return await cursor.fetchall()
+
+
+async def main():
+    print(await get_user_by_id(user_id=1))
+    await update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+
+    #### Ten concurrent misses run the query once
+    results = await asyncio.gather(*(fetch_users_with_cache(query="SELECT * FROM users")
+                                     for _ in range(10)))
+    print(f"{len(results)} results, {query_cache.stats()['coalesced']} coalesced")
+    await get_async_pool('users.db').close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+import asyncio
+import sqlite3
+import weakref
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+from db_pool import DEFAULT_PRAGMAS
+
+
+class AsyncSQLitePool:
+    """
+    A pool of aiosqlite connections to one database file for one event loop.
+
+    At most `size` connections are open; further callers wait up to
+    `timeout` seconds. Connections keep the same PRAGMAs and statement cache
+    as the threaded SQLitePool, are checked with a trivial query on checkout
+    and are replaced when they fail.
+    """
+
+    def __init__(self, database, size=5, timeout=30, pragmas=None, health_check=True,
+                 statement_cache_size=256):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.health_check = health_check
+        self.statement_cache_size = statement_cache_size
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self._stats = {'checkouts': 0, 'waits': 0, 'created': 0, 'discarded': 0}
+
+    async def _connect(self):
+        conn = await aiosqlite.connect(self.database, cached_statements=self.statement_cache_size)
+        for name, value in self.pragmas.items():
+            await conn.execute(f"PRAGMA {name} = {value}")
+        self._stats['created'] += 1
+        return conn
+
+    async def _healthy(self, conn):
+        if not self.health_check:
+            return True
+        try:
+            async with conn.execute("SELECT 1") as cursor:
+                await cursor.fetchone()
+            return True
+        except (sqlite3.Error, ValueError):  # ValueError: the connection was closed
+            return False
+
+    async def acquire(self, timeout=None):
+        """Checks out a connection; raises TimeoutError if none frees up in time."""
+        timeout = self.timeout if timeout is None else timeout
+        if self._slots.locked():
+            self._stats['waits'] += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No connection to {self.database} within {timeout}s") from None
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if await self._healthy(conn):
+                    break
+                await self._close(conn)
+            else:
+                conn = await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+        self._stats['checkouts'] += 1
+        return conn
+
+    async def release(self, conn):
+        """Returns a connection, rolling back anything left uncommitted."""
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.append(conn)
+        except (sqlite3.Error, ValueError):
+            await self._close(conn)
+        finally:
+            self._slots.release()
+
+    async def _close(self, conn):
+        self._stats['discarded'] += 1
+        try:
+            await conn.close()
+        except (sqlite3.Error, ValueError):
+            pass
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['idle'] = len(self._idle)
+        return stats
+
+    async def close(self):
+        """Closes the idle connections."""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._close(conn)
+
+
+# One set of pools per event loop; aiosqlite connections belong to the loop that opened them
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_async_pool(database='users.db', **options):
+    """
+    Returns the pool for `database` on the running event loop, creating it
+    on first use. `options` only apply when the pool is created.
+    """
+    pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    pool = pools.get(database)
+    if pool is None:
+        pool = pools[database] = AsyncSQLitePool(database, **options)
+    return pool
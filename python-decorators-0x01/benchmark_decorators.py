@@ -0,0 +1,221 @@
+#!/usr/bin/python3
+"""
+Measures the per-call overhead of each decorator and of common stacks.
+
+Usage: ./benchmark_decorators.py [--rows N] [--calls N] [--db memory|disk|both]
+                                 [--baseline FILE] [--save-baseline] [--tolerance 0.25]
+
+A users table of --rows generated rows is created in a shared in-memory
+database and/or in a file in a temporary directory, and the 'users.db'
+pool every @with_db_connection draws from is pointed at it. Each case is
+a primary-key read or write; it is warmed up, then timed call by call.
+The report gives ops/s, p50 and p99 latency, and the p50 overhead over
+the undecorated read or write. Decorator log lines go to /dev/null but
+are still produced, so their cost is part of the figures.
+
+With --save-baseline the results are written to FILE. Otherwise, when
+FILE exists, every case whose p50 is more than --tolerance slower than
+its baseline is listed and the exit status is 1.
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, 'benchmark_decorators.baseline.json')
+MEMORY_URI = 'file:benchmark_users?mode=memory&cache=shared'
+
+SELECT_BY_ID = "SELECT * FROM users WHERE id = ?"
+UPDATE_AGE = "UPDATE users SET age = age + 1 WHERE id = ?"
+
+
+def create_users(conn, rows):
+    """Creates and fills the users table with `rows` generated users."""
+    conn.execute("DROP TABLE IF EXISTS users")
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                 "email TEXT NOT NULL, age INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO users (id, name, email, age) VALUES (?, ?, ?, ?)",
+                     ((i, f"user {i}", f"user{i}@example.com", random.randint(18, 90))
+                      for i in range(1, rows + 1)))
+    conn.commit()
+
+
+def time_case(call, calls):
+    """Runs `call` after a warm-up and returns its per-call latencies in ns, sorted."""
+    for _ in range(min(calls // 10, 1000)):
+        call()
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter_ns()
+        call()
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return samples
+
+
+def summarize(samples):
+    count = len(samples)
+    return {
+        'ops_per_s': count / (sum(samples) / 1e9),
+        'p50_us': samples[count // 2] / 1000,
+        'p99_us': samples[min(count - 1, int(count * 0.99))] / 1000,
+    }
+
+
+def build_cases(conn, ids):
+    """
+    Returns (name, baseline name, call) for each case. `conn` is a pooled
+    connection held for the cases that take one directly.
+    """
+    log_queries = __import__('0-log_queries')
+    with_db_connection = __import__('1-with_db_connection').with_db_connection
+    transactional = __import__('2-transactional').transactional
+    retry_on_failure = __import__('3-retry_on_failure').retry_on_failure(retries=3, delay=0.01)
+    cache_query = __import__('4-cache_query').cache_query
+    log_queries.start_query_logging(logging.NullHandler())  # time the enqueue, not the output
+
+    def select(conn, user_id):
+        return conn.execute(SELECT_BY_ID, (user_id,)).fetchone()
+
+    def select_query(conn, query, params):
+        return conn.execute(query, params).fetchone()
+
+    def update(conn, user_id):
+        conn.execute(UPDATE_AGE, (user_id,))
+
+    def update_and_commit(conn, user_id):
+        update(conn, user_id)
+        conn.commit()
+
+    @log_queries.log_queries
+    def logged_select(query, params):
+        return conn.execute(query, params).fetchone()
+
+    connection_read = with_db_connection(select)
+    retried_read = retry_on_failure(select)
+    cached_read = cache_query(select_query)
+    transactional_write = transactional(update)
+    connection_retried_read = with_db_connection(retried_read)
+    connection_cached_read = with_db_connection(cached_read)
+    connection_write = with_db_connection(transactional_write)
+    connection_retried_write = with_db_connection(retry_on_failure(transactional_write))
+    return [
+        ('read', None, lambda: select(conn, next(ids))),
+        ('log_queries', 'read', lambda: logged_select(SELECT_BY_ID, (next(ids),))),
+        ('with_db_connection', 'read', lambda: connection_read(next(ids))),
+        ('retry_on_failure', 'read', lambda: retried_read(conn, next(ids))),
+        ('cache_query (hit)', 'read', lambda: cached_read(conn, SELECT_BY_ID, (next(ids),))),
+        ('connection+retry', 'read', lambda: connection_retried_read(next(ids))),
+        ('connection+cache', 'read', lambda: connection_cached_read(SELECT_BY_ID, (next(ids),))),
+        ('write', None, lambda: update_and_commit(conn, next(ids))),
+        ('transactional', 'write', lambda: transactional_write(conn, next(ids))),
+        ('connection+transactional', 'write', lambda: connection_write(next(ids))),
+        ('connection+retry+transactional', 'write', lambda: connection_retried_write(next(ids))),
+    ]
+
+
+def run_mode(mode, rows, calls, workdir):
+    """Benchmarks every case against the `mode` database; returns {case: summary}."""
+    from db_pool import configure_pool
+
+    if mode == 'memory':
+        path, uri = MEMORY_URI, True
+    else:
+        path, uri = os.path.join(workdir, 'users.db'), False
+    # Holding a connection keeps a shared in-memory database alive
+    keeper = sqlite3.connect(path, uri=uri)
+    create_users(keeper, rows)
+    pool = configure_pool('users.db', path=path, uri=uri)
+    __import__('4-cache_query').query_cache.clear()
+
+    ids = itertools.cycle(random.sample(range(1, rows + 1), min(rows, 256)))
+    conn = pool.acquire()
+    results = {}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for name, baseline, call in build_cases(conn, ids):
+                results[name] = summarize(time_case(call, calls))
+                results[name]['baseline'] = baseline
+    finally:
+        pool.release(conn)
+        pool.close()
+        keeper.close()
+    return results
+
+
+def print_report(mode, results):
+    print(f"\n{mode} database")
+    print(f"{'case':>32} {'ops/s':>12} {'p50 us':>9} {'p99 us':>9} {'overhead us':>12}")
+    for name, result in results.items():
+        baseline = results.get(result['baseline'])
+        overhead = f"{result['p50_us'] - baseline['p50_us']:>12.1f}" if baseline else f"{'-':>12}"
+        print(f"{name:>32} {result['ops_per_s']:>12,.0f} {result['p50_us']:>9.1f} "
+              f"{result['p99_us']:>9.1f} {overhead}")
+
+
+def find_regressions(results, baseline, tolerance):
+    """Lists the cases whose p50 grew by more than `tolerance` over the baseline."""
+    regressions = []
+    for mode, cases in results.items():
+        for name, result in cases.items():
+            before = baseline.get('results', {}).get(mode, {}).get(name)
+            if before and result['p50_us'] > before['p50_us'] * (1 + tolerance):
+                regressions.append(f"{mode}/{name}: p50 {before['p50_us']:.1f}us -> {result['p50_us']:.1f}us")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-decorator overhead benchmark")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--calls', type=int, default=20_000)
+    parser.add_argument('--db', choices=('memory', 'disk', 'both'), default='both')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+    baseline_file = os.path.abspath(args.baseline)
+
+    modes = ('memory', 'disk') if args.db == 'both' else (args.db,)
+    print(f"rows: {args.rows}, calls per case: {args.calls}")
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        # query_cache.db and any other relative paths land in the scratch directory
+        os.chdir(workdir)
+        sys.path.insert(0, HERE)
+        for mode in modes:
+            results[mode] = run_mode(mode, args.rows, args.calls, workdir)
+            print_report(mode, results[mode])
+        os.chdir(HERE)
+
+    if args.save_baseline:
+        with open(baseline_file, mode='w', encoding='utf-8') as file:
+            json.dump({'rows': args.rows, 'calls': args.calls, 'results': results}, file, indent=2)
+        print(f"\nBaseline saved to {baseline_file}")
+        return 0
+    if not os.path.exists(baseline_file):
+        return 0
+    with open(baseline_file, mode='r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    if (baseline.get('rows'), baseline.get('calls')) != (args.rows, args.calls):
+        print(f"\nNote: baseline used rows={baseline.get('rows')}, calls={baseline.get('calls')}")
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo case is more than {args.tolerance:.0%} slower than the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
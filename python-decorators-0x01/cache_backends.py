@@ -0,0 +1,274 @@
+import hashlib
+import pickle
+import sqlite3
+import time
+
+from db_pool import SQLitePool
+
+# Invalidation records older than this are pruned; L1 entries expire long before
+INVALIDATION_LOG_SECONDS = 3600
+
+# Access times are rewritten at most this often, so cache hits stay reads
+TOUCH_INTERVAL = 10
+
+
+class CacheBackend:
+    """
+    Second-tier store behind a QueryCache.
+
+    A backend keeps query results outside the process, so they survive
+    restarts and can be shared by several workers. Keys are the tuples
+    built by make_key(); values are any picklable result.
+    """
+
+    def get(self, key):
+        """Returns (value, seconds_left) or None; seconds_left is None when the entry never expires."""
+        raise NotImplementedError
+
+    def set(self, key, value, tables=(), ttl=None, since=None):
+        """
+        Stores a result for `ttl` seconds (0 or None: no expiry). When
+        `since` is given, the write is skipped if one of `tables` was
+        invalidated after that sequence number.
+        """
+        raise NotImplementedError
+
+    def invalidate_tables(self, tables):
+        """
+        Drops the results that read from `tables` and records the
+        invalidation. May skip both for tables no result was ever stored for.
+        """
+        raise NotImplementedError
+
+    def invalidated_since(self, seq):
+        """
+        Returns (latest_seq, tables invalidated after `seq`), letting other
+        processes drop the same results from their L1. `seq` of None just
+        returns the latest sequence number.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache backend stored in an SQLite file that processes on one host share.
+
+    Values are pickled with protocol 5. Entries are tagged with the tables
+    they read, and once the file holds more than `max_bytes` of values the
+    expired entries go first, then the least recently used ones. WAL mode
+    lets readers in every process work while one of them writes. Disk
+    errors are logged and treated as misses, so a broken cache file never
+    fails a query.
+    """
+
+    def __init__(self, path='query_cache.db', max_bytes=256 * 1024 * 1024, pool_size=4):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._pool = SQLitePool(path, size=pool_size)
+        self._create_schema()
+
+    def _create_schema(self):
+        conn = self._pool.acquire()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at
+                    ON cache_entries (accessed_at);
+                CREATE TABLE IF NOT EXISTS cache_tags (
+                    key TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    PRIMARY KEY (key, table_name)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_cache_tags_table_name
+                    ON cache_tags (table_name);
+                CREATE TABLE IF NOT EXISTS cache_invalidations (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    invalidated_at REAL NOT NULL
+                );
+                -- Every table a stored result ever read; eviction never
+                -- deletes from it, so invalidations of tables missing here
+                -- can safely go unrecorded
+                CREATE TABLE IF NOT EXISTS cache_tables (
+                    table_name TEXT PRIMARY KEY
+                ) WITHOUT ROWID;
+                INSERT OR IGNORE INTO cache_tables (table_name)
+                    SELECT DISTINCT table_name FROM cache_tags;
+                CREATE TABLE IF NOT EXISTS cache_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    total_bytes INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO cache_meta (id, total_bytes) VALUES (0, 0);
+
+                -- Keep the byte total and the tags in step with the entries
+                CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries
+                BEGIN
+                    UPDATE cache_meta SET total_bytes = total_bytes + new.size WHERE id = 0;
+                END;
+                CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries
+                BEGIN
+                    UPDATE cache_meta SET total_bytes = total_bytes - old.size WHERE id = 0;
+                    DELETE FROM cache_tags WHERE key = old.key;
+                END;
+            """)
+            conn.commit()
+        finally:
+            self._pool.release(conn)
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _run(self, action, default=None):
+        conn = self._pool.acquire()
+        try:
+            result = action(conn)
+            conn.commit()
+            return result
+        except (sqlite3.Error, pickle.PickleError) as e:
+            print(f"[LOG] Cache backend error: {e}")
+            conn.rollback()
+            return default
+        finally:
+            self._pool.release(conn)
+
+    def get(self, key):
+        digest = self._digest(key)
+
+        def action(conn):
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?",
+                (digest,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            now = time.time()
+            if expires_at is not None and expires_at <= now:
+                return None
+            if now - accessed_at > TOUCH_INTERVAL:
+                conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, digest))
+            return pickle.loads(value), (None if expires_at is None else expires_at - now)
+
+        return self._run(action)
+
+    def set(self, key, value, tables=(), ttl=None, since=None):
+        try:
+            blob = pickle.dumps(value, protocol=5)
+        except (pickle.PickleError, TypeError, AttributeError) as e:
+            print(f"[LOG] Result not cached on disk: {e}")
+            return
+        if len(blob) > self.max_bytes:
+            return
+        digest = self._digest(key)
+        tables = sorted(set(tables))
+        now = time.time()
+
+        def action(conn):
+            conn.execute("BEGIN IMMEDIATE")  # take the write lock before checking `since`
+            new_tables = [table for table in tables if conn.execute(
+                "INSERT OR IGNORE INTO cache_tables (table_name) VALUES (?)", (table,)).rowcount]
+            # Invalidations of these tables went unrecorded until now, so
+            # `since` cannot vouch for this result: log one, which also
+            # makes the check below skip this first write
+            conn.executemany("INSERT INTO cache_invalidations (table_name, invalidated_at) VALUES (?, ?)",
+                             [(table, now) for table in new_tables])
+            if since is not None and tables:
+                placeholders = ', '.join('?' * len(tables))
+                changed = conn.execute(
+                    f"SELECT 1 FROM cache_invalidations WHERE seq > ? AND table_name IN ({placeholders}) LIMIT 1",
+                    (since, *tables)).fetchone()
+                if changed:
+                    return
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (digest,))
+            conn.execute(
+                "INSERT INTO cache_entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (digest, blob, len(blob), now + ttl if ttl else None, now))
+            conn.executemany("INSERT INTO cache_tags (key, table_name) VALUES (?, ?)",
+                             [(digest, table) for table in tables])
+            self._evict(conn, now)
+
+        self._run(action)
+
+    def _evict(self, conn, now):
+        total, = conn.execute("SELECT total_bytes FROM cache_meta WHERE id = 0").fetchone()
+        if total <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        # Then the least recently used, down to 90% so the next writes have room
+        target = self.max_bytes * 0.9
+        while True:
+            total, = conn.execute("SELECT total_bytes FROM cache_meta WHERE id = 0").fetchone()
+            if total <= target:
+                return
+            deleted = conn.execute(
+                "DELETE FROM cache_entries WHERE key IN "
+                "(SELECT key FROM cache_entries ORDER BY accessed_at LIMIT 64)").rowcount
+            if not deleted:
+                return
+
+    def invalidate_tables(self, tables):
+        tables = sorted({table.lower() for table in tables})
+        if not tables:
+            return 0
+        now = time.time()
+
+        def action(conn):
+            placeholders = ', '.join('?' * len(tables))
+            conn.execute("BEGIN IMMEDIATE")  # a set() registering one of the tables waits for us
+            # No result for these tables was ever stored, so nothing can be
+            # stale anywhere: commit without changes, which writes nothing
+            cached = conn.execute(
+                f"SELECT 1 FROM cache_tables WHERE table_name IN ({placeholders}) LIMIT 1",
+                tables).fetchone()
+            if cached is None:
+                return 0
+            removed = conn.execute(
+                f"DELETE FROM cache_entries WHERE key IN "
+                f"(SELECT key FROM cache_tags WHERE table_name IN ({placeholders}))",
+                tables).rowcount
+            conn.executemany("INSERT INTO cache_invalidations (table_name, invalidated_at) VALUES (?, ?)",
+                             [(table, now) for table in tables])
+            conn.execute("DELETE FROM cache_invalidations WHERE invalidated_at < ?",
+                         (now - INVALIDATION_LOG_SECONDS,))
+            return removed
+
+        return self._run(action, default=0)
+
+    def invalidated_since(self, seq):
+        def action(conn):
+            latest, = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations").fetchone()
+            if seq is None or latest <= seq:
+                return latest, set()
+            rows = conn.execute("SELECT DISTINCT table_name FROM cache_invalidations WHERE seq > ?", (seq,))
+            return latest, {table for table, in rows}
+
+        return self._run(action, default=(seq, set()))
+
+    def clear(self):
+        self._run(lambda conn: conn.execute("DELETE FROM cache_entries"))
+
+    def stats(self):
+        def action(conn):
+            entries, = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+            total, = conn.execute("SELECT total_bytes FROM cache_meta WHERE id = 0").fetchone()
+            return {'disk_entries': entries, 'disk_bytes': total}
+
+        return self._run(action, default={})
+
+    def close(self):
+        self._pool.close()
@@ -0,0 +1,163 @@
+import sqlite3
+import threading
+import time
+
+# Applied once when a connection is opened, not on every checkout
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers no longer block on the writer
+    'synchronous': 'NORMAL',  # fsync at checkpoints rather than every commit (safe with WAL)
+    'cache_size': -16000,  # 16 MB page cache per connection
+    'busy_timeout': 5000,  # wait up to 5s for locks instead of failing at once
+}
+
+
+class SQLitePool:
+    """
+    A thread-safe pool of SQLite connections to one database file.
+
+    Each thread is handed back the connection it used last whenever that
+    one is idle, which keeps its page and statement caches warm. At most
+    `size` connections are open; further callers wait up to `timeout`
+    seconds. Connections are checked with a trivial query on checkout and
+    replaced when they fail. Each connection keeps up to
+    `statement_cache_size` prepared statements (sqlite3's per-connection
+    statement cache, keyed on the SQL text), so repeated queries skip
+    re-parsing as long as their text is stable. With `uri=True`, `database`
+    is an SQLite URI such as `file:users?mode=memory&cache=shared`.
+    """
+
+    def __init__(self, database, size=5, timeout=30, pragmas=None, health_check=True,
+                 statement_cache_size=256, uri=False):
+        self.database = database
+        self.uri = uri
+        self.size = size
+        self.statement_cache_size = statement_cache_size
+        self.timeout = timeout
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.health_check = health_check
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stats = {'checkouts': 0, 'waits': 0, 'created': 0, 'discarded': 0}
+
+    def _connect(self):
+        # Connections may move between threads, never used by two at once
+        conn = sqlite3.connect(self.database, check_same_thread=False,
+                               cached_statements=self.statement_cache_size, uri=self.uri)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    def _healthy(self, conn):
+        if not self.health_check:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self, timeout=None):
+        """Checks out a connection; raises TimeoutError if none frees up in time."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            conn = None
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No connection to {self.database} within {timeout}s")
+                    self._stats['waits'] += 1
+                    self._cond.wait(remaining)
+                if self._idle:
+                    preferred = getattr(self._local, 'conn', None)
+                    if preferred is not None and preferred in self._idle:
+                        self._idle.remove(preferred)
+                        conn = preferred
+                    else:
+                        conn = self._idle.pop()
+                else:
+                    self._open += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except sqlite3.Error:
+                    self._discard(None)
+                    raise
+            elif not self._healthy(conn):
+                self._discard(conn)
+                continue
+
+            self._local.conn = conn
+            with self._cond:
+                self._stats['checkouts'] += 1
+            return conn
+
+    def release(self, conn):
+        """Returns a connection, rolling back anything left uncommitted."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        with self._cond:
+            self._open -= 1
+            self._stats['discarded'] += conn is not None
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._open - len(self._idle)
+        return stats
+
+    def close(self):
+        """Closes the idle connections."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def configure_pool(database, path=None, **options):
+    """
+    Creates (or replaces) the shared pool for `database` with `options`.
+    `path` makes the pool open another file (or URI) under that name, e.g.
+    to point every @with_db_connection at a test database.
+    """
+    with _pools_lock:
+        old = _pools.get(database)
+        _pools[database] = SQLitePool(database if path is None else path, **options)
+    if old is not None:
+        old.close()
+    return _pools[database]
+
+
+def get_pool(database='users.db'):
+    """Returns the shared pool for `database`, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = _pools[database] = SQLitePool(database)
+        return pool
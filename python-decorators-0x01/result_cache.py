@@ -0,0 +1,488 @@
+import asyncio
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# Every QueryCache registers here so a write can invalidate all of them
+_caches = weakref.WeakSet()
+
+_WHITESPACE = re.compile(r'\s+')
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+_READ_TABLES = re.compile(r'\b(?:from|join)\s+([\w."]+)', re.IGNORECASE)
+_WRITE_TABLE = re.compile(
+    r'^\s*(?:insert(?:\s+or\s+\w+)?\s+into|replace\s+into|update(?:\s+or\s+\w+)?'
+    r'|delete\s+from|drop\s+table(?:\s+if\s+exists)?|alter\s+table)\s+([\w."]+)',
+    re.IGNORECASE)
+
+
+def normalize_sql(query):
+    """
+    Canonical form of a statement for use in cache keys: whitespace is
+    collapsed and keywords lowercased outside string literals, so
+    formatting differences do not split the cache.
+    """
+    parts = _QUOTED.split(query.strip().rstrip(';').strip())
+    for i in range(0, len(parts), 2):  # even parts are outside quotes
+        parts[i] = _WHITESPACE.sub(' ', parts[i]).lower()
+    return ''.join(parts)
+
+
+def _table_name(name):
+    return name.strip('"').split('.')[-1].lower()
+
+
+def tables_read(query):
+    """Names of the tables a SELECT reads from."""
+    return {_table_name(name) for name in _READ_TABLES.findall(_QUOTED.sub("''", query))}
+
+
+def table_written(query):
+    """Name of the table a write statement modifies, or None for reads."""
+    match = _WRITE_TABLE.match(query)
+    return _table_name(match.group(1)) if match else None
+
+
+def make_key(query, params=(), database=None):
+    """
+    Builds a cache key from the database, normalized SQL and bound
+    parameters, or returns None when the parameters cannot be hashed.
+    The database is part of the key so the same SQL against two databases
+    never shares a result.
+    """
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    elif isinstance(params, list):
+        params = tuple(params)
+    key = (database, normalize_sql(query), params)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def estimate_size(value):
+    """Rough memory footprint of a query result (rows of scalars) in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+# Result of an async flight whose loader was cancelled: waiters look up again
+_RETRY = object()
+
+
+class _Flight:
+    """One in-progress load that concurrent callers for the same key share."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def resolve(self, value):
+        self.value = value
+        self._done.set()
+
+    def fail(self, error):
+        self.error = error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results.
+
+    Entries expire after `ttl` seconds, and the least recently used ones
+    are evicted once the cache holds more than `max_entries` results or
+    `max_bytes` of (estimated) result data. Each entry remembers the tables
+    its query read, so invalidate_tables() drops exactly the results a
+    write may have changed.
+
+    get_or_load() adds two protections against cache stampedes: concurrent
+    misses for one key share a single load (single-flight), and for
+    `stale_ttl` seconds after expiry an entry is still served while one
+    background refresh replaces it (stale-while-revalidate).
+
+    With a `backend` (see cache_backends.py), this cache is the L1 tier in
+    front of it: misses are looked up in the backend before running the
+    query, loaded results are written through, and invalidations are
+    shared. Invalidations made by other processes are picked up at most
+    `sync_interval` seconds later.
+
+    aget_or_load() gives coroutines the same protections without blocking
+    the event loop; sync and async callers share the cached entries.
+    """
+
+    MISSING = object()
+    FRESH, STALE = 'fresh', 'stale'
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300, stale_ttl=0,
+                 backend=None, sync_interval=1.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self._backend_seq = None  # last backend invalidation applied here
+        self._next_sync = 0.0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at, tables)
+        self._by_table = {}  # table -> set of keys
+        self._versions = {}  # table -> number of invalidations so far
+        self._flights = {}  # key -> _Flight for loads in progress
+        self._async_flights = {}  # (loop, key) -> future for async loads in progress
+        self._tasks = set()  # background async refreshes, kept alive until done
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                       'expirations': 0, 'invalidations': 0,
+                       'stale_hits': 0, 'coalesced': 0, 'refreshes': 0,
+                       'backend_hits': 0}
+        _caches.add(self)
+
+    def _lookup(self, key, sync_backend=True):
+        """Returns (value, state) where state is FRESH, STALE or MISSING."""
+        if sync_backend and self.backend is not None:
+            self._sync_backend()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None, self.MISSING
+            expires_at = entry[2]
+            now = time.monotonic()
+            if expires_at is not None and expires_at <= now:
+                if now < expires_at + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    return entry[0], self.STALE
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None, self.MISSING
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0], self.FRESH
+
+    def get(self, key):
+        """Returns the fresh cached value for `key`, or QueryCache.MISSING."""
+        value, state = self._lookup(key)
+        return value if state is self.FRESH else self.MISSING
+
+    def get_or_load(self, key, loader, tables=(), ttl=None, refresh=None):
+        """
+        Returns the cached value for `key`, calling `loader()` to fill a miss.
+
+        Only one caller runs the loader for a given key at a time; the
+        others wait for and share its result (or its exception). A stale
+        entry is returned immediately while `refresh()` (default: loader)
+        reloads it on a background thread.
+        """
+        value, state = self._lookup(key)
+        if state is self.FRESH:
+            return value
+        if state is self.STALE:
+            self._refresh_in_background(key, refresh or loader, tables, ttl)
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                versions = self._table_versions(tables)
+            else:
+                self._stats['coalesced'] += 1
+        if not leader:
+            return flight.wait()
+
+        try:
+            found = self.backend.get(key) if self.backend is not None else None
+            if found is None:
+                value = loader()
+            else:
+                value, ttl_left = found
+        except BaseException as e:
+            flight.fail(e)
+            raise
+        else:
+            if found is None:
+                self._set_if_current(key, value, tables, ttl, versions)
+            else:
+                with self._lock:
+                    self._stats['backend_hits'] += 1
+                # Keep it in L1 no longer than it has left on disk
+                self._set_if_current(key, value, tables, ttl_left or 0, versions, persist=False)
+            flight.resolve(value)
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _refresh_in_background(self, key, refresh, tables, ttl):
+        with self._lock:
+            if key in self._flights:
+                return  # a refresh is already running
+            flight = self._flights[key] = _Flight()
+            versions = self._table_versions(tables)
+            self._stats['refreshes'] += 1
+
+        def run():
+            try:
+                value = refresh()
+            except Exception as e:
+                print(f"[LOG] Background refresh failed: {e}")
+                flight.fail(e)
+            else:
+                self._set_if_current(key, value, tables, ttl, versions)
+                flight.resolve(value)
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    async def aget_or_load(self, key, loader, tables=(), ttl=None, refresh=None):
+        """
+        get_or_load() for coroutines: `loader` and `refresh` are coroutine
+        functions. Concurrent misses on one event loop await a single load,
+        stale entries are refreshed in a background task, and backend I/O
+        runs in a worker thread. If the caller running the load is
+        cancelled, its waiters look the key up again and one of them loads it.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._backend_sync_due():
+                await asyncio.to_thread(self._sync_backend)
+            value, state = self._lookup(key, sync_backend=False)
+            if state is self.FRESH:
+                return value
+            if state is self.STALE:
+                self._refresh_in_task(key, refresh or loader, tables, ttl)
+                return value
+
+            with self._lock:
+                flight = self._async_flights.get((loop, key))
+                leader = flight is None
+                if leader:
+                    flight = self._async_flights[(loop, key)] = loop.create_future()
+                    versions = self._table_versions(tables)
+                else:
+                    self._stats['coalesced'] += 1
+            if leader:
+                break
+            value = await asyncio.shield(flight)  # a cancelled waiter must not cancel the load
+            if value is not _RETRY:
+                return value
+
+        try:
+            value = await self._aload(key, loader, tables, ttl, versions)
+        except asyncio.CancelledError:
+            flight.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            flight.exception()  # retrieved; waiters re-raise it, nobody else needs to
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._async_flights.pop((loop, key), None)
+
+    async def _aload(self, key, loader, tables, ttl, versions, use_backend=True):
+        found = None
+        if self.backend is not None and use_backend:
+            found = await asyncio.to_thread(self.backend.get, key)
+        if found is not None:
+            value, ttl_left = found
+            with self._lock:
+                self._stats['backend_hits'] += 1
+            self._set_if_current(key, value, tables, ttl_left or 0, versions, persist=False)
+            return value
+        value = await loader()
+        if self.backend is not None:
+            await asyncio.to_thread(self._set_if_current, key, value, tables, ttl, versions)
+        else:
+            self._set_if_current(key, value, tables, ttl, versions)
+        return value
+
+    def _refresh_in_task(self, key, refresh, tables, ttl):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if (loop, key) in self._async_flights:
+                return  # a refresh is already running
+            flight = self._async_flights[(loop, key)] = loop.create_future()
+            versions = self._table_versions(tables)
+            self._stats['refreshes'] += 1
+
+        async def run():
+            try:
+                flight.set_result(await self._aload(key, refresh, tables, ttl, versions,
+                                                    use_backend=False))
+            except asyncio.CancelledError:
+                flight.set_result(_RETRY)
+                raise
+            except Exception as e:
+                print(f"[LOG] Background refresh failed: {e}")
+                flight.set_exception(e)
+                flight.exception()
+            finally:
+                with self._lock:
+                    self._async_flights.pop((loop, key), None)
+
+        task = loop.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _table_versions(self, tables):
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def _set_if_current(self, key, value, tables, ttl, versions, persist=True):
+        """Stores a loaded value unless a write invalidated its tables meanwhile."""
+        with self._lock:
+            if self._table_versions(tables) != versions:
+                return
+            self.set(key, value, tables, ttl)
+            since = self._backend_seq
+        if persist and self.backend is not None:
+            self.backend.set(key, value, tables, self.ttl if ttl is None else ttl, since=since)
+
+    def _backend_sync_due(self):
+        return self.backend is not None and time.monotonic() >= self._next_sync
+
+    def _sync_backend(self):
+        """Applies invalidations that other processes recorded in the backend."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_sync:
+                return
+            self._next_sync = now + self.sync_interval
+            seq = self._backend_seq
+        latest, tables = self.backend.invalidated_since(seq)
+        with self._lock:
+            if self._backend_seq == seq:
+                self._backend_seq = latest
+        if tables:
+            self._invalidate_local(tables)
+
+    def set(self, key, value, tables=(), ttl=None):
+        """
+        Stores a result. `ttl` of None uses the cache default and 0 never
+        expires; values larger than max_bytes are not cached.
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at, frozenset(tables))
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        value, size, _, tables = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def set_backend(self, backend):
+        """
+        Puts `backend` (or None) behind this cache, closing the one it
+        replaces. Returns `backend`.
+        """
+        with self._lock:
+            old, self.backend = self.backend, backend
+            self._backend_seq = None
+            self._next_sync = 0.0
+        if old is not None and old is not backend:
+            old.close()
+        return backend
+
+    def invalidate_tables(self, tables):
+        """Drops every entry that read from one of `tables`; returns how many."""
+        removed = self._invalidate_local(tables)
+        if self.backend is not None:
+            self.backend.invalidate_tables(tables)
+        return removed
+
+    def _invalidate_local(self, tables):
+        with self._lock:
+            keys = set()
+            for table in tables:
+                table = table.lower()
+                self._versions[table] = self._versions.get(table, 0) + 1
+                keys |= self._by_table.get(table, set())
+            for key in keys:
+                self._remove(key)
+            self._stats['invalidations'] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Empties this cache and its backend."""
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        """Returns hit/miss/eviction counters plus current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not self.MISSING
+
+
+def invalidate_tables(tables):
+    """Invalidates `tables` in every live QueryCache."""
+    tables = set(tables)
+    if not tables:
+        return 0
+    return sum(cache.invalidate_tables(tables) for cache in list(_caches))
+
+
+async def ainvalidate_tables(tables):
+    """
+    invalidate_tables() for coroutines: when a cache has a backend, the
+    invalidation (a disk write) runs in a worker thread, as in aget_or_load().
+    """
+    if any(cache.backend is not None for cache in list(_caches)):
+        return await asyncio.to_thread(invalidate_tables, tables)
+    return invalidate_tables(tables)
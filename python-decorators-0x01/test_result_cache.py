@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Test cases for the QueryCache behind @cache_query."""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from cache_backends import SQLiteCacheBackend
+from result_cache import QueryCache, ainvalidate_tables, estimate_size, make_key
+
+transactional = __import__('2-transactional').transactional
+
+
+class TestEviction(unittest.TestCase):
+    """Test that the least recently used entries are evicted first."""
+
+    def test_evicts_past_max_entries(self):
+        """Test that the oldest entry goes once max_entries is exceeded."""
+        cache = QueryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('c', 3)
+        self.assertIs(cache.get('a'), QueryCache.MISSING)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_lookup_marks_entry_as_recently_used(self):
+        """Test that reading an entry protects it from the next eviction."""
+        cache = QueryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIs(cache.get('b'), QueryCache.MISSING)
+
+    def test_evicts_past_max_bytes(self):
+        """Test that entries are evicted to keep the results under max_bytes."""
+        value = 'x' * 1000
+        cache = QueryCache(max_bytes=estimate_size(value) * 2 + 10)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, value)
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get('a'), QueryCache.MISSING)
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+
+    def test_skips_results_larger_than_max_bytes(self):
+        """Test that a result bigger than the whole cache is not stored."""
+        cache = QueryCache(max_bytes=100)
+        cache.set('a', 'x' * 1000)
+        self.assertEqual(len(cache), 0)
+
+
+class TestExpiry(unittest.TestCase):
+    """Test that entries expire after their TTL."""
+
+    @patch('result_cache.time.monotonic')
+    def test_entry_expires_after_ttl(self, mock_monotonic):
+        """Test that an entry is a miss once its TTL has passed."""
+        mock_monotonic.return_value = 1000.0
+        cache = QueryCache(ttl=10)
+        cache.set('a', 1)
+        mock_monotonic.return_value = 1009.0
+        self.assertEqual(cache.get('a'), 1)
+        mock_monotonic.return_value = 1010.0
+        self.assertIs(cache.get('a'), QueryCache.MISSING)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    @patch('result_cache.time.monotonic')
+    def test_ttl_of_zero_never_expires(self, mock_monotonic):
+        """Test that ttl=0 keeps an entry until it is evicted."""
+        mock_monotonic.return_value = 1000.0
+        cache = QueryCache(ttl=10)
+        cache.set('a', 1, ttl=0)
+        mock_monotonic.return_value = 1_000_000.0
+        self.assertEqual(cache.get('a'), 1)
+
+    @patch('result_cache.time.monotonic')
+    def test_stale_entry_served_while_refreshing(self, mock_monotonic):
+        """Test that an expired entry within stale_ttl is returned and reloaded."""
+        mock_monotonic.return_value = 1000.0
+        cache = QueryCache(ttl=10, stale_ttl=60)
+        cache.set('a', 'old')
+        mock_monotonic.return_value = 1020.0
+        refreshed = threading.Event()
+
+        def refresh():
+            refreshed.set()
+            return 'new'
+
+        self.assertEqual(cache.get_or_load('a', refresh), 'old')
+        self.assertTrue(refreshed.wait(5))
+        for _ in range(100):  # the refresh stores its result right after returning
+            if cache.get('a') == 'new':
+                break
+            time.sleep(0.01)
+        self.assertEqual(cache.get('a'), 'new')
+
+
+class TestInvalidation(unittest.TestCase):
+    """Test that writes through @transactional drop the results they change."""
+
+    def setUp(self):
+        """Create a users table in a temporary database."""
+        self.workdir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.workdir.name, 'users.db'))
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        self.conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY)")
+        self.conn.execute("INSERT INTO users (id, email) VALUES (1, 'old@example.com')")
+        self.conn.commit()
+        self.cache = QueryCache()
+
+    def tearDown(self):
+        """Close the connection and remove the database."""
+        self.conn.close()
+        self.workdir.cleanup()
+
+    def cached_read(self, query):
+        """Read through the cache as @cache_query does."""
+        key = make_key(query, (), 'users.db')
+        return self.cache.get_or_load(key, lambda: self.conn.execute(query).fetchall(),
+                                      tables={'users'})
+
+    def test_commit_invalidates_tables_written(self):
+        """Test that a committed UPDATE drops cached reads of that table."""
+        query = "SELECT email FROM users WHERE id = 1"
+        self.assertEqual(self.cached_read(query), [('old@example.com',)])
+
+        @transactional
+        def update_email(conn, email):
+            conn.execute("UPDATE users SET email = ? WHERE id = 1", (email,))
+
+        update_email(self.conn, 'new@example.com')
+        self.assertEqual(self.cached_read(query), [('new@example.com',)])
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_write_to_other_table_keeps_entries(self):
+        """Test that writing another table leaves cached users reads alone."""
+        self.cached_read("SELECT email FROM users")
+
+        @transactional
+        def add_order(conn):
+            conn.execute("INSERT INTO orders (id) VALUES (1)")
+
+        add_order(self.conn)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_rolled_back_write_keeps_entries(self):
+        """Test that a failed transaction does not invalidate anything."""
+        self.cached_read("SELECT email FROM users")
+
+        @transactional
+        def failing_update(conn):
+            conn.execute("UPDATE users SET email = 'x' WHERE id = 1")
+            raise ValueError("boom")
+
+        with patch('builtins.print'):
+            failing_update(self.conn)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_load_racing_a_write_is_not_stored(self):
+        """Test that a result loaded before an invalidation is not cached."""
+        def loader():
+            self.cache.invalidate_tables({'users'})  # a write commits mid-load
+            return 'stale'
+
+        self.assertEqual(self.cache.get_or_load('k', loader, tables={'users'}), 'stale')
+        self.assertIs(self.cache.get('k'), QueryCache.MISSING)
+
+
+class TestBackendInvalidation(unittest.TestCase):
+    """Test that invalidations reach other processes sharing a cache file."""
+
+    def setUp(self):
+        """Open two caches, as two processes would, on one cache file."""
+        self.workdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.workdir.name, 'query_cache.db')
+        self.first = QueryCache(backend=SQLiteCacheBackend(path, max_bytes=1000), sync_interval=0)
+        self.second = QueryCache(backend=SQLiteCacheBackend(path, max_bytes=1000), sync_interval=0)
+        self.key = make_key("SELECT * FROM users", (), 'users.db')
+
+    def tearDown(self):
+        """Close both backends and remove the cache file."""
+        self.first.set_backend(None)
+        self.second.set_backend(None)
+        self.workdir.cleanup()
+
+    def store(self, value):
+        """Load a users result in the first cache until it is on disk."""
+        for _ in range(2):  # the first result for a table is kept in memory only
+            self.first.get_or_load(self.key, lambda: value, tables={'users'})
+        self.assertIsNotNone(self.first.backend.get(self.key))
+
+    def test_invalidation_after_disk_eviction(self):
+        """Test that an entry evicted from the file is still invalidated in memory."""
+        self.store(['old'])
+        self.first.backend.set(('big',), 'x' * 980, tables={'orders'})
+        self.assertIsNone(self.first.backend.get(self.key))
+        self.assertEqual(self.first.get(self.key), ['old'])
+
+        self.second.invalidate_tables({'users'})
+        self.assertIs(self.first.get(self.key), QueryCache.MISSING)
+
+    def test_load_racing_another_process_write_is_not_stored(self):
+        """Test that a result loaded before another process's write stays off disk."""
+        self.store(['old'])
+        self.first.invalidate_tables({'users'})
+
+        def loader():
+            self.second.invalidate_tables({'users'})  # the other process commits mid-load
+            return ['stale']
+
+        self.first.get_or_load(self.key, loader, tables={'users'})
+        self.assertIsNone(self.second.backend.get(self.key))
+
+
+    def test_async_invalidation_runs_off_the_event_loop(self):
+        """Test that ainvalidate_tables() writes to the backend from a worker thread."""
+        threads = []
+        backend = self.first.backend
+        invalidate = backend.invalidate_tables
+
+        def record_thread(tables):
+            threads.append(threading.current_thread())
+            return invalidate(tables)
+
+        with patch.object(backend, 'invalidate_tables', side_effect=record_thread):
+            asyncio.run(ainvalidate_tables({'users'}))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test that concurrent misses for one key run the loader once."""
+
+    def test_concurrent_threads_share_one_load(self):
+        """Test that threads missing the same key wait for one loader call."""
+        cache = QueryCache()
+        calls = []
+        started = threading.Event()
+        results = []
+
+        def loader():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'rows'
+
+        def read():
+            results.append(cache.get_or_load('k', loader))
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['rows'] * 8)
+        self.assertEqual(cache.stats()['coalesced'], 7)
+
+    def test_waiters_share_loader_error(self):
+        """Test that the loader's exception reaches every waiting thread."""
+        cache = QueryCache()
+        started = threading.Event()
+        errors = []
+
+        def loader():
+            started.set()
+            time.sleep(0.2)
+            raise sqlite3.OperationalError("database is locked")
+
+        def read():
+            try:
+                cache.get_or_load('k', loader)
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(len(cache), 0)
+
+    def test_concurrent_coroutines_share_one_load(self):
+        """Test that coroutines missing the same key await one loader call."""
+        cache = QueryCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'rows'
+
+        async def main():
+            return await asyncio.gather(*(cache.aget_or_load('k', loader) for _ in range(10)))
+
+        self.assertEqual(asyncio.run(main()), ['rows'] * 10)
+        self.assertEqual(len(calls), 1)
+
+    def test_cancelled_leader_hands_over_the_load(self):
+        """Test that waiters reload instead of failing when the leader is cancelled."""
+        cache = QueryCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        async def main():
+            leader = asyncio.create_task(cache.aget_or_load('k', loader))
+            await asyncio.sleep(0.01)
+            waiters = [asyncio.create_task(cache.aget_or_load('k', loader)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await asyncio.gather(*waiters)
+
+        self.assertEqual(asyncio.run(main()), [2, 2, 2])
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,29 +1,53 @@
 #!/usr/bin/python3
 
-import mysql.connector
 from mysql.connector import Error
 
-def stream_users():
+from db_pool import get_pool
+
+# Upper bound on rows held client-side at any one time, whatever the caller asks for
+MAX_CHUNK_SIZE = 10000
+
+
+def stream_users(chunk_size=1000):
     """
     Generator that streams user rows one at a time from user_data table.
+
+    Rows come from an unbuffered cursor, so the server sends the result set
+    as it is read instead of the whole table landing in client memory first.
+    At most `chunk_size` rows (capped at MAX_CHUNK_SIZE) are resident at once.
+    The connection comes from the shared pool and is given back even when
+    the consumer stops early, e.g. `islice(stream_users(), 6)`.
     """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    chunk_size = min(chunk_size, MAX_CHUNK_SIZE)
+
+    pool = get_pool()
+    connection = None
+    cursor = None
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='alxprodev_user',
-            password='@1Suburban.',
-            database='ALX_prodev'
-        )
-
-        cursor = connection.cursor()
+        connection = pool.acquire()
+        cursor = connection.cursor(buffered=False)
         cursor.execute("SELECT * FROM user_data")
 
-        for row in cursor:
-            yield row  # YIELD one row at a time
-
-        cursor.close()
-        connection.close()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row  # YIELD one row at a time
 
     except Error as e:
         print(f"Database error: {e}")
         return
+    finally:
+        # Closing an unbuffered cursor before all rows were read raises
+        # "Unread result found"; draining the rest of a huge table would
+        # defeat streaming, so the pool drops that connection instead.
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Error:
+                pass
+        if connection is not None:
+            pool.release(connection)
@@ -1,48 +1,274 @@
 #!/usr/bin/python3
 
-import mysql.connector
+import operator
+
 from mysql.connector import Error
 
+from db_pool import pooled_connection
+
+try:
+    import numpy as np
+except ImportError:  # only needed for columnar batches
+    np = None
+
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+NUMERIC_COLUMNS = ('age',)
+
+# Comparison operators that can be compiled into the SQL WHERE clause
+SQL_OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+class Predicate:
+    """
+    A `column op value` condition on user_data rows.
+
+    `op` is either one of SQL_OPERATORS, in which case the condition is
+    pushed down into the query's WHERE clause, or a callable
+    `op(column_value, value) -> bool` that is evaluated in Python on the
+    rows the database returns.
+    """
+
+    def __init__(self, column, op, value):
+        if column not in USER_COLUMNS:
+            raise ValueError(f"Unknown column {column!r}; expected one of {USER_COLUMNS}")
+        if not callable(op) and op not in SQL_OPERATORS:
+            raise ValueError(f"Unsupported operator {op!r}")
+        self.column = column
+        self.op = op
+        self.value = value
+
+    @property
+    def pushable(self):
+        """Whether the condition can run inside the database."""
+        return not callable(self.op)
+
+    def to_sql(self):
+        """Returns the (sql, params) fragment for a pushable condition."""
+        return f"{self.column} {self.op} %s", (self.value,)
+
+    def matches(self, column_value):
+        """Evaluates the condition in Python against one column value."""
+        compare = self.op if callable(self.op) else SQL_OPERATORS[self.op]
+        return compare(column_value, self.value)
+
+
+class StringColumn:
+    """
+    A column of strings packed into one UTF-8 buffer plus an offsets array,
+    instead of one Python str object per row.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(b''.join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def take(self, indices):
+        """Returns a new column holding only the rows at `indices`."""
+        starts, ends = self.offsets[indices], self.offsets[indices + 1]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=offsets[1:])
+        data = b''.join(self.data[s:e] for s, e in zip(starts, ends))
+        return StringColumn(data, offsets)
+
+
+class ColumnBatch:
+    """
+    A batch of user_data rows stored column by column.
+
+    Numeric columns are NumPy float64 arrays, so filters such as
+    `batch['age'] > 25` run over the whole batch at once; text columns are
+    StringColumn objects.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, names, rows):
+        columns = {}
+        for name, values in zip(names, zip(*rows)):
+            if name in NUMERIC_COLUMNS:
+                columns[name] = np.fromiter(values, dtype=np.float64, count=len(rows))
+            else:
+                columns[name] = StringColumn.from_values(values)
+        return cls(columns)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
 
-def stream_users_in_batches(batch_size):
+    def select(self, names):
+        return ColumnBatch({name: self.columns[name] for name in names})
+
+    def filter(self, mask):
+        """Keeps the rows where the boolean array `mask` is True."""
+        indices = np.flatnonzero(mask)
+        return ColumnBatch({
+            name: column[indices] if isinstance(column, np.ndarray) else column.take(indices)
+            for name, column in self.columns.items()
+        })
+
+    def mask(self, predicates):
+        """Evaluates predicates column-wise into one boolean array."""
+        keep = np.ones(len(self), dtype=bool)
+        for predicate in predicates:
+            column = self.columns[predicate.column]
+            if isinstance(column, np.ndarray):
+                keep &= np.asarray(predicate.matches(column), dtype=bool)
+            else:
+                keep &= np.fromiter((predicate.matches(v) for v in column),
+                                    dtype=bool, count=len(column))
+        return keep
+
+    def rows(self):
+        """Iterates the batch as row tuples, in column order."""
+        return zip(*self.columns.values())
+
+
+def compile_query(columns=None, where=()):
+    """
+    Builds the SELECT for a projection and a list of predicates.
+
+    Returns (query, params, fetched, local): `fetched` is the column list
+    the query returns, which also carries any columns the Python-only
+    predicates in `local` need beyond the requested projection.
+    """
+    columns = list(columns or USER_COLUMNS)
+    for column in columns:
+        if column not in USER_COLUMNS:
+            raise ValueError(f"Unknown column {column!r}; expected one of {USER_COLUMNS}")
+
+    pushed = [p for p in where if p.pushable]
+    local = [p for p in where if not p.pushable]
+    fetched = columns + [p.column for p in local if p.column not in columns]
+    fetched = list(dict.fromkeys(fetched))
+
+    query = f"SELECT {', '.join(fetched)} FROM user_data"
+    params = []
+    if pushed:
+        clauses = []
+        for predicate in pushed:
+            clause, clause_params = predicate.to_sql()
+            clauses.append(clause)
+            params.extend(clause_params)
+        query += " WHERE " + " AND ".join(clauses)
+    return query, tuple(params), fetched, local
+
+
+def stream_users_in_batches(batch_size, columns=None, where=(), columnar=False):
     """
     Generator that yields batches of rows from user_data.
-    Each batch is a list of rows (tuples).
+    Each batch is a list of rows (tuples), or a ColumnBatch when `columnar`
+    is set (this requires NumPy).
+
+    `columns` selects which columns each row carries (all by default) and
+    `where` is a list of Predicate objects every row must satisfy. Pushable
+    predicates filter on the server; the rest are applied to each batch
+    before it is yielded, so a batch may hold fewer than batch_size rows.
     """
+    if columnar and np is None:
+        raise ImportError("columnar batches require numpy; install it with `pip install numpy`")
+    query, params, fetched, local = compile_query(columns, where)
+    width = len(columns) if columns else len(USER_COLUMNS)
+    checks = [(fetched.index(p.column), p) for p in local]
+
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='alxprodev_user',
-            password='@1Suburban.',
-            database='ALX_prodev'
-        )
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM user_data")
-
-        batch = []
-        for row in cursor:
-            batch.append(row)
-            if len(batch) == batch_size:
-                yield batch
-                batch = []  # Reset for next batch
-
-        # Yield the final batch if not empty
-        if batch:
-            yield batch
+        with pooled_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+
+            if columnar:
+                yield from _columnar_batches(cursor, batch_size, fetched, local,
+                                             columns or USER_COLUMNS)
+            else:
+                yield from _row_batches(cursor, batch_size, checks, width)
 
-        cursor.close()
-        connection.close()
+            cursor.close()
     except Error as e:
         print(f"Error fetching batches: {e}")
         return
 
 
-def batch_processing(batch_size):
+def _row_batches(cursor, batch_size, checks, width):
+    """
+    Groups cursor rows into lists of tuples, applying Python-side checks.
+    """
+    batch = []
+    for row in cursor:
+        if checks:
+            if not all(p.matches(row[i]) for i, p in checks):
+                continue
+            row = row[:width]
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []  # Reset for next batch
+
+    # Yield the final batch if not empty
+    if batch:
+        yield batch
+
+
+def _columnar_batches(cursor, batch_size, fetched, local, columns):
+    """
+    Converts each fetchmany chunk into a ColumnBatch, applying Python-side
+    predicates as vectorized masks.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        batch = ColumnBatch.from_rows(fetched, rows)
+        if local:
+            batch = batch.filter(batch.mask(local)).select(columns)
+        if len(batch):
+            yield batch
+
+
+def batch_processing(batch_size, columnar=False):
     """
     Processes batches to filter users over the age of 25.
     Yields individual users (rows) from each batch who meet the condition.
+    With `columnar`, yields whole filtered ColumnBatch objects instead.
     """
-    for batch in stream_users_in_batches(batch_size):
+    over_25 = [Predicate('age', '>', 25)]  # filtered by MySQL, not in Python
+    for batch in stream_users_in_batches(batch_size, where=over_25, columnar=columnar):
+        if columnar:
+            yield batch
+            continue
         for user in batch:
-            if float(user[3]) > 25:  # age is the 4th column
-                yield user
+            yield user
+
+
+def filter_batch(batch, predicates):
+    """
+    Applies predicates to a ColumnBatch in Python, one vectorized pass per
+    predicate; useful for conditions the database cannot evaluate.
+    """
+    return batch.filter(batch.mask(predicates))
@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 from itertools import islice
-stream_users = __import__('0-stream_users')
+stream_users = __import__('0-stream_users').stream_users
 
 # iterate over the generator function and print only the first 6 rows
 
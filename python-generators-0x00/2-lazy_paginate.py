@@ -1,25 +1,28 @@
 #!/usr/bin/python3
 
-import mysql.connector
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+
 from mysql.connector import Error
 
+from db_pool import get_pool, pooled_connection
+
+# Columns keyset pagination may seek on; user_id breaks ties for the others
+ORDERING_KEYS = ('user_id', 'email', 'age')
+
+
 def paginate_users(page_size, offset):
     """
     Fetches a single page of users starting at the given offset.
     """
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='alxprodev_user',
-            password='@1Suburban.',
-            database='ALX_prodev'
-        )
-        cursor = connection.cursor()
-        query = "SELECT * FROM user_data LIMIT %s OFFSET %s"
-        cursor.execute(query, (page_size, offset))
-        rows = cursor.fetchall()
-        cursor.close()
-        connection.close()
+        with pooled_connection() as connection:
+            cursor = connection.cursor()
+            query = "SELECT * FROM user_data LIMIT %s OFFSET %s"
+            cursor.execute(query, (page_size, offset))
+            rows = cursor.fetchall()
+            cursor.close()
         return rows
     except Error as e:
         print(f"Error in pagination: {e}")
@@ -29,11 +32,117 @@ def lazy_paginate(page_size):
     """
     Generator that lazily fetches and yields pages of users.
     Only loads the next page when needed.
+
+    Pages come from keyset_paginate in user_id order, so each page seeks
+    past the previous one instead of re-reading it with OFFSET, and a full
+    walk stays linear in the table size.
     """
-    offset = 0
-    while True:  # This is our single loop
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
+    for page, _ in keyset_paginate(page_size):
         yield page
-        offset += page_size
+
+
+def encode_token(last_values, key='user_id'):
+    """
+    Turns the ordering key and the values of the last row of a page into
+    an opaque token.
+    """
+    payload = json.dumps({'key': key, 'after': [str(value) for value in last_values]})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_token(token, key='user_id'):
+    """
+    Recovers the ordering values stored in a token from encode_token.
+    Raises ValueError if the token is malformed or was made for another key.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        token_key, after = payload['key'], payload['after']
+    except (ValueError, UnicodeError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid continuation token: {token!r}") from e
+    if token_key != key:
+        raise ValueError(f"Continuation token was made for key {token_key!r}, not {key!r}")
+    return after
+
+
+def seek_users(connection, page_size, after=None, key='user_id'):
+    """
+    Fetches the page of users that follows `after` in (key, user_id) order.
+
+    `after` holds the ordering values of the previous page's last row, or
+    None for the first page. The WHERE clause seeks straight to that point
+    through the index, so every page costs the same whatever its depth.
+    """
+    if key not in ORDERING_KEYS:
+        raise ValueError(f"Cannot paginate on {key!r}; use one of {ORDERING_KEYS}")
+
+    if key == 'user_id':
+        order_by = "user_id"
+        seek = "user_id > %s"
+    else:
+        order_by = f"{key}, user_id"
+        seek = f"({key} > %s OR ({key} = %s AND user_id > %s))"
+
+    query = "SELECT * FROM user_data"
+    params = []
+    if after is not None:
+        query += f" WHERE {seek}"
+        params = list(after) if key == 'user_id' else [after[0], after[0], after[1]]
+    query += f" ORDER BY {order_by} LIMIT %s"
+    params.append(page_size)
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def keyset_paginate(page_size, token=None, key='user_id', prefetch=False):
+    """
+    Generator that yields (page, next_token) pairs using keyset pagination.
+
+    A single pooled connection is reused for every page. Passing a previously
+    returned `next_token` resumes right after that page. With `prefetch`
+    the next page is fetched on a background thread while the caller works
+    on the current one.
+    """
+    if key not in ORDERING_KEYS:
+        raise ValueError(f"Cannot paginate on {key!r}; use one of {ORDERING_KEYS}")
+    key_index = ('user_id', 'name', 'email', 'age').index(key)
+
+    def last_values(page):
+        last = page[-1]
+        return [last[0]] if key == 'user_id' else [last[key_index], last[0]]
+
+    after = decode_token(token, key) if token else None
+    pool = get_pool()
+    connection = None
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        connection = pool.acquire()
+
+        page = seek_users(connection, page_size, after, key)
+        while page:
+            after = last_values(page)
+            upcoming = None
+            if executor is not None and len(page) == page_size:
+                upcoming = executor.submit(seek_users, connection, page_size, after, key)
+
+            yield page, encode_token(after, key)
+
+            if len(page) < page_size:
+                break
+            if upcoming is not None:
+                page = upcoming.result()
+            else:
+                page = seek_users(connection, page_size, after, key)
+    except Error as e:
+        print(f"Error in keyset pagination: {e}")
+    finally:
+        if executor is not None:
+            # Let an in-flight prefetch finish before its connection goes away
+            executor.shutdown(wait=True)
+        if connection is not None:
+            pool.release(connection)
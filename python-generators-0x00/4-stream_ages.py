@@ -1,42 +1,253 @@
 #!/usr/bin/python3
 
-import mysql.connector
+import math
+
 from mysql.connector import Error
 
+from db_pool import pooled_connection
+
+DEFAULT_PERCENTILES = (0.5, 0.9, 0.99)
+
+
 def stream_user_ages():
     """
     Generator that yields user ages one at a time from user_data table.
     """
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='alxprodev_user',
-            password='@1Suburban.',
-            database='ALX_prodev'
-        )
-        cursor = connection.cursor()
-        cursor.execute("SELECT age FROM user_data")
-
-        for row in cursor:
-            yield float(row[0])  # row is a tuple like (age,)
-
-        cursor.close()
-        connection.close()
+        with pooled_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT age FROM user_data")
+
+            for row in cursor:
+                yield float(row[0])  # row is a tuple like (age,)
+
+            cursor.close()
     except Error as e:
         print(f"Error streaming ages: {e}")
 
-def calculate_average_age():
+
+class TDigest:
+    """
+    Mergeable quantile sketch in the style of Dunning's t-digest.
+
+    Values are kept as weighted centroids; centroids near the tails stay
+    small and those near the median grow large, so memory is bounded by
+    roughly `compression` centroids while tail quantiles stay accurate.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.count = 0
+        self._centroids = []  # [mean, weight], sorted by mean
+        self._buffer = []
+
+    def add(self, value, weight=1):
+        self._buffer.append([value, weight])
+        self.count += weight
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other):
+        """Folds another digest's centroids into this one."""
+        other._compress()
+        for mean, weight in other._centroids:
+            self.add(mean, weight)
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        merged = [list(points[0])]
+        cumulative = 0
+        for mean, weight in points[1:]:
+            last = merged[-1]
+            q = (cumulative + (last[1] + weight) / 2) / self.count
+            limit = 4 * self.count * q * (1 - q) / self.compression
+            if last[1] + weight <= max(limit, 1):
+                last[1] += weight
+                last[0] += (mean - last[0]) * weight / last[1]
+            else:
+                cumulative += last[1]
+                merged.append([mean, weight])
+        self._centroids = merged
+
+    def quantile(self, q):
+        """Estimates the value below which a fraction `q` of the data lies."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        self._compress()
+        if not self._centroids:
+            return None
+        target = q * self.count
+        cumulative = 0
+        previous = None
+        for mean, weight in self._centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                if previous is None:
+                    return mean
+                prev_mean, prev_center = previous
+                return prev_mean + (mean - prev_mean) * (target - prev_center) / (center - prev_center)
+            previous = (mean, center)
+            cumulative += weight
+        return self._centroids[-1][0]
+
+
+class StreamingStats:
+    """
+    Single-pass accumulator for count, sum, mean, min, max, variance and
+    approximate percentiles.
+
+    Variance uses Welford's update, so it stays numerically stable over
+    tens of millions of values, and percentiles come from a TDigest.
+    Accumulators built over separate partitions can be combined with merge.
+    """
+
+    def __init__(self, compression=100):
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.min = None
+        self.max = None
+        self._m2 = 0.0
+        self._digest = TDigest(compression)
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        self.sum += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._digest.add(value)
+
+    def merge(self, other):
+        """Combines another accumulator into this one (Chan et al.)."""
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._digest.merge(other._digest)
+
+    @property
+    def variance(self):
+        """Population variance, matching MySQL's VAR_POP."""
+        return self._m2 / self.count if self.count else None
+
+    def percentile(self, q):
+        return self._digest.quantile(q)
+
+    def as_dict(self, percentiles=DEFAULT_PERCENTILES):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.mean if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'variance': self.variance,
+            'percentiles': {q: self.percentile(q) for q in percentiles},
+        }
+
+
+def summarize(values, percentiles=DEFAULT_PERCENTILES):
+    """
+    Computes summary statistics over any iterable of numbers in one pass.
+    """
+    stats = StreamingStats()
+    for value in values:
+        stats.add(value)
+    return stats.as_dict(percentiles)
+
+
+def _histogram_percentiles(histogram, count, percentiles):
+    """
+    Reads percentiles off an ordered list of (value, frequency) buckets.
+    """
+    result = {}
+    for q in percentiles:
+        rank = max(1, math.ceil(q * count))
+        cumulative = 0
+        for value, frequency in histogram:
+            cumulative += frequency
+            if cumulative >= rank:
+                result[q] = float(value)
+                break
+    return result
+
+
+def sql_age_stats(percentiles=DEFAULT_PERCENTILES):
+    """
+    Computes age statistics inside MySQL instead of streaming every row.
+
+    Scalar aggregates come from one aggregate query. Percentiles are read
+    from a GROUP BY histogram over whole-year buckets, so only one row per
+    distinct age crosses the wire; they are exact for the schema's integer
+    DECIMAL ages and within a year otherwise.
     """
-    Calculates and prints the average age using the stream_user_ages generator.
+    try:
+        with pooled_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                "SELECT COUNT(age), SUM(age), AVG(age), MIN(age), MAX(age), VAR_POP(age) "
+                "FROM user_data"
+            )
+            count, total, mean, minimum, maximum, variance = cursor.fetchone()
+
+            histogram = []
+            if count and percentiles:
+                cursor.execute(
+                    "SELECT FLOOR(age) AS bucket, COUNT(*) FROM user_data "
+                    "GROUP BY bucket ORDER BY bucket"
+                )
+                histogram = cursor.fetchall()
+            cursor.close()
+    except Error as e:
+        print(f"Error aggregating ages: {e}")
+        return None
+
+    def as_float(value):
+        return None if value is None else float(value)
+
+    return {
+        'count': count,
+        'sum': as_float(total) if count else 0.0,
+        'mean': as_float(mean),
+        'min': as_float(minimum),
+        'max': as_float(maximum),
+        'variance': as_float(variance),
+        'percentiles': _histogram_percentiles(histogram, count, percentiles),
+    }
+
+
+def age_stats(source=None, percentiles=DEFAULT_PERCENTILES):
     """
-    total = 0
-    count = 0
-    for age in stream_user_ages():  # ✅ Only one loop used here
-        total += age
-        count += 1
+    Returns age statistics for `source`.
 
-    if count > 0:
-        average = total / count
-        print(f"Average age of users: {average:.2f}")
+    With no source the work is done by the database via sql_age_stats;
+    any other iterable of ages (e.g. stream_user_ages()) is summarized with
+    a streaming accumulator.
+    """
+    if source is None:
+        return sql_age_stats(percentiles)
+    return summarize(source, percentiles)
+
+
+def calculate_average_age():
+    """
+    Calculates and prints the average age of users.
+    The mean is computed by MySQL, so no ages are streamed to Python.
+    """
+    stats = age_stats()
+    if stats and stats['count']:
+        print(f"Average age of users: {stats['mean']:.2f}")
     else:
         print("No users found to calculate average.")
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error
+
+from db_pool import get_pool, pooled_connection
+
+_DONE = object()  # end-of-partition marker placed on the queues
+
+HEX_SPACE = 16 ** 8  # user_id values are UUID4 strings; partition on the first 8 hex digits
+
+
+def key_ranges(partitions):
+    """
+    Splits the user_id key space into `partitions` contiguous ranges.
+
+    Returns (low, high) pairs of user_id prefixes where low is inclusive,
+    high exclusive and None leaves that end open, so together the ranges
+    cover every possible user_id exactly once.
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be a positive integer")
+    bounds = [format(i * HEX_SPACE // partitions, '08x') for i in range(1, partitions)]
+    lows = [None] + bounds
+    highs = bounds + [None]
+    return list(zip(lows, highs))
+
+
+def _partition_query(bounds, columns, ordered, strategy, partitions):
+    """Builds the SELECT and parameters reading one partition."""
+    query = f"SELECT {', '.join(columns)} FROM user_data"
+    if strategy == 'bucket':
+        # Synthetic buckets spread any key evenly but cannot use an index
+        query += " WHERE MOD(CRC32(user_id), %s) = %s"
+        params = (partitions, bounds)
+    else:
+        low, high = bounds
+        clauses, params = [], []
+        if low is not None:
+            clauses.append("user_id >= %s")
+            params.append(low)
+        if high is not None:
+            clauses.append("user_id < %s")
+            params.append(high)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        params = tuple(params)
+    if ordered:
+        query += " ORDER BY user_id"
+    return query, params
+
+
+def _put(out_queue, item, stop):
+    """Blocks on a full queue (back-pressure) but gives up once stopped."""
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _scan_partition(query, params, batch_size, out_queue, stop):
+    """
+    Worker: reads one partition over its own connection into `out_queue`.
+    """
+    if stop.is_set():
+        return  # the consumer is gone; do not check out a connection or run the query
+    pool = get_pool()
+    connection = None
+    cursor = None
+    try:
+        connection = pool.acquire()
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        while not stop.is_set():
+            rows = cursor.fetchmany(batch_size)
+            if not rows or not _put(out_queue, rows, stop):
+                break
+    except Error as e:
+        _put(out_queue, e, stop)
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Error:
+                pass
+        if connection is not None:
+            pool.release(connection)
+        _put(out_queue, _DONE, stop)
+
+
+def partitioned_scan(partitions=4, workers=None, batch_size=1000, ordered=False,
+                     max_buffered_batches=8, columns=('user_id', 'name', 'email', 'age'),
+                     strategy='range'):
+    """
+    Generator that reads user_data in parallel and yields its rows.
+
+    The table is split into `partitions` user_id ranges (or CRC32 buckets
+    with strategy='bucket'), each read by a worker thread on its own
+    pooled connection. At most `workers` partitions, and never more than
+    the pool size, are read at once; the others start as earlier ones
+    finish, so no worker sits waiting for a connection while the slow
+    consumer holds the rest back. With `ordered` rows come out in user_id
+    order, partition by partition; otherwise batches are yielded as soon
+    as any worker has one. Workers block once `max_buffered_batches`
+    batches are waiting, so a slow consumer throttles the scan instead of
+    buffering the table in memory. Closing the generator early stops every
+    worker. Database errors, including PoolError when no connection frees
+    up in time, are raised to the consumer rather than ending the stream
+    early.
+    """
+    if strategy not in ('range', 'bucket'):
+        raise ValueError("strategy must be 'range' or 'bucket'")
+    if strategy == 'bucket' and ordered:
+        raise ValueError("ordered scans need strategy='range'")
+    parts = key_ranges(partitions) if strategy == 'range' else list(range(partitions))
+    workers = min(workers or partitions, get_pool().size)
+    stop = threading.Event()
+
+    if ordered:
+        queues = [queue.Queue(maxsize=max_buffered_batches) for _ in parts]
+    else:
+        shared = queue.Queue(maxsize=max_buffered_batches)
+        queues = [shared] * len(parts)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='user-scan')
+    try:
+        for bounds, out_queue in zip(parts, queues):
+            query, params = _partition_query(bounds, columns, ordered, strategy, partitions)
+            executor.submit(_scan_partition, query, params, batch_size, out_queue, stop)
+
+        pending = len(parts)
+        current = 0
+        while pending:
+            item = queues[current].get()
+            if item is _DONE:
+                pending -= 1
+                if ordered:
+                    current += 1
+                continue
+            if isinstance(item, Error):
+                raise item
+            yield from item
+    finally:
+        stop.set()
+        # Partitions that have not started are dropped rather than queried
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _partition_totals(query, params):
+    """Worker: returns (count, sum) of ages for one partition."""
+    with pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        count, total = cursor.fetchone()
+        cursor.close()
+    return count, float(total or 0)
+
+
+def partitioned_average_age(partitions=4, workers=None):
+    """
+    Computes the average age with one COUNT/SUM query per key range, run
+    concurrently, and combines the partial results.
+    """
+    jobs = []
+    for bounds in key_ranges(partitions):
+        query, params = _partition_query(bounds, ['COUNT(age)', 'SUM(age)'],
+                                         False, 'range', partitions)
+        jobs.append((query, params))
+    try:
+        with ThreadPoolExecutor(max_workers=workers or partitions) as executor:
+            results = list(executor.map(lambda job: _partition_totals(*job), jobs))
+    except Error as e:
+        print(f"Error computing average age: {e}")
+        return None
+    count = sum(c for c, _ in results)
+    total = sum(t for _, t in results)
+    return total / count if count else None
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+
+import asyncio
+import weakref
+
+import aiomysql
+
+from db_pool import DB_CONFIG
+
+# One aiomysql pool per event loop; aiomysql pools cannot be shared across loops
+_pools = weakref.WeakKeyDictionary()
+
+
+async def get_async_pool(minsize=1, maxsize=10):
+    """
+    Returns the aiomysql pool for the running event loop, creating it on
+    first use. The size arguments only apply when the pool is created.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = asyncio.ensure_future(aiomysql.create_pool(
+            host=DB_CONFIG['host'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password'],
+            db=DB_CONFIG['database'],
+            minsize=minsize,
+            maxsize=maxsize,
+        ))
+    try:
+        return await asyncio.shield(pool)  # a cancelled caller must not cancel the shared connect
+    except Exception:
+        if _pools.get(loop) is pool:
+            del _pools[loop]  # don't cache the failure: the next call connects again
+        raise
+
+
+async def _fetch_batches(query, params, batch_size):
+    """
+    Async generator yielding lists of rows from a server-side cursor.
+
+    The next fetchmany is started before the current batch is handed out,
+    so the network read overlaps with the consumer's work. If the consumer
+    stops early or is cancelled, the in-flight read is cancelled and the
+    connection is closed instead of draining the rest of the result set.
+    """
+    pool = await get_async_pool()
+    connection = await pool.acquire()
+    cursor = None
+    pending = None
+    finished = False
+    try:
+        cursor = await connection.cursor(aiomysql.SSCursor)
+        await cursor.execute(query, params)
+        pending = asyncio.ensure_future(cursor.fetchmany(batch_size))
+        while True:
+            rows = await pending
+            if not rows:
+                finished = True
+                break
+            pending = asyncio.ensure_future(cursor.fetchmany(batch_size))
+            yield list(rows)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+        if finished:
+            await cursor.close()
+        else:
+            connection.close()  # the pool drops closed connections
+        pool.release(connection)
+
+
+async def async_stream_users(batch_size=1000):
+    """
+    Async generator that streams user rows one at a time from user_data.
+    """
+    batches = _fetch_batches("SELECT * FROM user_data", (), batch_size)
+    try:
+        async for batch in batches:
+            for row in batch:
+                yield row
+    except aiomysql.Error as e:
+        print(f"Database error: {e}")
+    finally:
+        await batches.aclose()  # release the cursor now, not at garbage collection
+
+
+async def async_stream_users_in_batches(batch_size):
+    """
+    Async generator that yields batches (lists of row tuples) from user_data.
+    """
+    batches = _fetch_batches("SELECT * FROM user_data", (), batch_size)
+    try:
+        async for batch in batches:
+            yield batch
+    except aiomysql.Error as e:
+        print(f"Error fetching batches: {e}")
+    finally:
+        await batches.aclose()
+
+
+async def async_lazy_paginate(page_size):
+    """
+    Async generator that yields pages of users, seeking on user_id over one
+    pooled connection. The next page is requested while the caller is still
+    working on the current one.
+    """
+    pool = await get_async_pool()
+    connection = await pool.acquire()
+    upcoming = None
+
+    async def fetch_page(after):
+        async with connection.cursor() as cursor:
+            if after is None:
+                await cursor.execute(
+                    "SELECT * FROM user_data ORDER BY user_id LIMIT %s", (page_size,))
+            else:
+                await cursor.execute(
+                    "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                    (after, page_size))
+            return list(await cursor.fetchall())
+
+    try:
+        page = await fetch_page(None)
+        while page:
+            if len(page) == page_size:
+                upcoming = asyncio.ensure_future(fetch_page(page[-1][0]))
+            yield page
+            if upcoming is None:
+                break
+            page = await upcoming
+            upcoming = None
+    except aiomysql.Error as e:
+        print(f"Error in pagination: {e}")
+    finally:
+        if upcoming is not None and not upcoming.done():
+            # A query is mid-flight; the connection cannot be reused safely
+            upcoming.cancel()
+            connection.close()
+        pool.release(connection)
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+import json
+import os
+from datetime import datetime
+
+from db_pool import pooled_connection
+
+DEFAULT_CHECKPOINT = 'user_data.checkpoint.json'
+
+
+def load_watermark(checkpoint_file=DEFAULT_CHECKPOINT):
+    """
+    Reads the (updated_at, user_id) watermark saved by a previous run, or
+    None when there is no checkpoint yet.
+    """
+    if not os.path.exists(checkpoint_file):
+        return None
+    with open(checkpoint_file, mode='r', encoding='utf-8') as file:
+        state = json.load(file)
+    return datetime.fromisoformat(state['updated_at']), state['user_id']
+
+
+def save_watermark(watermark, checkpoint_file=DEFAULT_CHECKPOINT):
+    """
+    Atomically persists a watermark so a crash never leaves a torn file.
+    """
+    updated_at, user_id = watermark
+    tmp_file = f"{checkpoint_file}.tmp"
+    with open(tmp_file, mode='w', encoding='utf-8') as file:
+        json.dump({'updated_at': updated_at.isoformat(), 'user_id': user_id}, file)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def stream_users_since(watermark=None, batch_size=1000, lag_seconds=1):
+    """
+    Generator that yields rows inserted or updated after `watermark`.
+
+    Rows come in (updated_at, user_id) order, each as
+    (user_id, name, email, age, updated_at), read in keyset batches so no
+    cursor stays open between batches. Rows changed in the last
+    `lag_seconds` are left for the next run, since a transaction that is
+    still committing can stamp a slightly earlier updated_at. Database
+    errors are raised, so a job can tell a failed run from one that found
+    no changes.
+    """
+    query = (
+        "SELECT user_id, name, email, age, updated_at FROM user_data "
+        "WHERE updated_at <= NOW(6) - INTERVAL %s MICROSECOND"
+    )
+    seek = " AND (updated_at > %s OR (updated_at = %s AND user_id > %s))"
+    order = " ORDER BY updated_at, user_id LIMIT %s"
+    lag = int(lag_seconds * 1_000_000)
+
+    while True:
+        with pooled_connection() as connection:
+            cursor = connection.cursor()
+            if watermark is None:
+                cursor.execute(query + order, (lag, batch_size))
+            else:
+                updated_at, user_id = watermark
+                cursor.execute(query + seek + order,
+                               (lag, updated_at, updated_at, user_id, batch_size))
+            rows = cursor.fetchall()
+            cursor.close()
+
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            break
+        watermark = (rows[-1][4], rows[-1][0])
+
+
+def stream_changed_users(checkpoint_file=DEFAULT_CHECKPOINT, batch_size=1000, lag_seconds=1):
+    """
+    Generator that yields only the rows changed since the last checkpoint.
+
+    The watermark of the last row handed out is saved to `checkpoint_file`
+    after every `batch_size` rows and when the stream ends, so a job that
+    stops midway resumes close to where it left off and re-reads at most
+    one batch. Reprocessing a row must therefore be harmless. A database
+    error is raised once the rows already handed out are checkpointed.
+    """
+    watermark = load_watermark(checkpoint_file)
+    seen = 0
+    try:
+        for row in stream_users_since(watermark, batch_size, lag_seconds):
+            yield row
+            # Recorded only once the consumer has come back for the next row
+            watermark = (row[4], row[0])
+            seen += 1
+            if seen % batch_size == 0:
+                save_watermark(watermark, checkpoint_file)
+    finally:
+        if watermark is not None and seen:
+            save_watermark(watermark, checkpoint_file)
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""
+Compares tuple and columnar batches from stream_users_in_batches.
+
+Usage: ./benchmark_batches.py [batch_size]
+
+Each mode runs in a fresh interpreter so peak RSS is measured per mode.
+The workload is the batch_processing one: keep users over 25 and sum
+their ages, row by row for tuples and vectorized for columnar batches.
+"""
+
+import resource
+import subprocess
+import sys
+import time
+
+processing = __import__('1-batch_processing')
+
+
+def run_mode(mode, batch_size):
+    """
+    Streams the whole table in `mode` and returns (rows, seconds, peak_kb).
+    """
+    started = time.perf_counter()
+    rows = 0
+    total_age = 0.0
+    if mode == 'tuple':
+        for batch in processing.stream_users_in_batches(batch_size):
+            rows += len(batch)
+            total_age += sum(float(user[3]) for user in batch if float(user[3]) > 25)
+    else:
+        for batch in processing.stream_users_in_batches(batch_size, columnar=True):
+            rows += len(batch)
+            ages = batch['age']
+            total_age += float(ages[ages > 25].sum())
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is reported in kilobytes on Linux
+    return rows, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main(batch_size=1000):
+    print(f"batch size: {batch_size}")
+    print(f"{'mode':>10} {'rows':>12} {'rows/s':>14} {'peak RSS MB':>12}")
+    for mode in ('tuple', 'columnar'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, str(batch_size)],
+            check=True, capture_output=True, text=True).stdout
+        rows, elapsed, peak_kb = output.split()
+        rows, elapsed, peak_kb = int(rows), float(elapsed), int(peak_kb)
+        rate = rows / elapsed if elapsed else 0
+        print(f"{mode:>10} {rows:>12} {rate:>14,.0f} {peak_kb / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--mode':
+        size = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+        print(*run_mode(sys.argv[2], size))
+    else:
+        main(*(int(arg) for arg in sys.argv[1:2]))
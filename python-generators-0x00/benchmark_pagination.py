@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Compares page latency of LIMIT/OFFSET against keyset pagination.
+
+Usage: ./benchmark_pagination.py [page_size] [repeats]
+
+For each target depth the OFFSET query is timed as paginate_users runs it,
+and the keyset query is timed seeking from the user_id found at that depth.
+Depths beyond the end of user_data are reported as skipped.
+"""
+
+import statistics
+import sys
+import time
+
+from db_pool import pooled_connection
+
+paginator = __import__('2-lazy_paginate')
+
+OFFSETS = (0, 1_000_000, 10_000_000)
+
+
+def time_query(cursor, query, params, repeats):
+    """
+    Runs a query `repeats` times and returns the median latency in ms.
+    """
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(page_size=100, repeats=5):
+    with pooled_connection() as connection:
+        _run(connection, page_size, repeats)
+
+
+def _run(connection, page_size, repeats):
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    total = cursor.fetchone()[0]
+    print(f"user_data rows: {total}, page size: {page_size}, repeats: {repeats}")
+    print(f"{'offset':>12} {'OFFSET ms':>12} {'keyset ms':>12} {'speedup':>9}")
+
+    for offset in OFFSETS:
+        if offset >= total:
+            print(f"{offset:>12} {'skipped (table too small)':>35}")
+            continue
+
+        offset_ms = time_query(
+            cursor, "SELECT * FROM user_data LIMIT %s OFFSET %s",
+            (page_size, offset), repeats)
+
+        # Position the keyset seek at the same depth; this lookup is not timed
+        after = None
+        if offset:
+            cursor.execute(
+                "SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s",
+                (offset - 1,))
+            after = [cursor.fetchone()[0]]
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            paginator.seek_users(connection, page_size, after)
+            samples.append((time.perf_counter() - start) * 1000)
+        keyset_ms = statistics.median(samples)
+
+        print(f"{offset:>12} {offset_ms:>12.2f} {keyset_ms:>12.2f} "
+              f"{offset_ms / keyset_ms:>8.1f}x")
+
+    cursor.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
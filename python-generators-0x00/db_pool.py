@@ -0,0 +1,233 @@
+#!/usr/bin/python3
+"""
+Process-wide MySQL connection pool shared by the generator modules.
+
+Connections are opened lazily up to `size`, handed out with acquire() and
+returned with release(). Idle connections are pinged before reuse when
+they have been idle a while, recycled after `max_lifetime` seconds, and
+discarded if they come back with an unread result set. stats() reports
+checkout and wait metrics.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'alxprodev_user',
+    'password': '@1Suburban.',
+    'database': 'ALX_prodev',
+}
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of mysql.connector connections.
+    """
+
+    def __init__(self, size=5, checkout_timeout=30, max_lifetime=1800,
+                 ping_after=30, **connect_kwargs):
+        if size < 1:
+            raise ValueError("size must be a positive integer")
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.connect_kwargs = {**DB_CONFIG, **connect_kwargs}
+        self.pid = os.getpid()
+
+        self._idle = deque()  # (connection, created_at, released_at)
+        self._created_at = {}  # id(connection) -> creation time
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'max_wait': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+            'discarded': 0,
+        }
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.connect_kwargs)
+        self._created_at[id(connection)] = time.monotonic()
+        with self._cond:
+            self._stats['created'] += 1
+        return connection
+
+    def _healthy(self, connection, created_at, released_at):
+        """Decides whether an idle connection may be handed out again."""
+        now = time.monotonic()
+        if now - created_at > self.max_lifetime:
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        if now - released_at > self.ping_after:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                with self._cond:
+                    self._stats['failed_health_checks'] += 1
+                return False
+        return True
+
+    def acquire(self, timeout=None):
+        """
+        Checks out a connection, waiting up to `timeout` seconds (default
+        checkout_timeout) for one to free up. Raises PoolError on timeout.
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        waited = False
+        while True:
+            candidate = None
+            with self._cond:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                while not self._idle and self._open >= self.size:
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolError(f"No connection available within {timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    candidate = self._idle.pop()
+                else:
+                    self._open += 1
+
+            if candidate is None:
+                try:
+                    connection = self._connect()
+                except Error:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+            elif self._healthy(*candidate):
+                connection = candidate[0]
+            else:
+                self._close(candidate[0])
+                continue
+
+            wait = time.monotonic() - started
+            with self._cond:
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                    self._stats['wait_time'] += wait
+                    self._stats['max_wait'] = max(self._stats['max_wait'], wait)
+            return connection
+
+    def release(self, connection, discard=False):
+        """
+        Returns a connection to the pool. Connections that are broken, left
+        with an unread result, or explicitly discarded are closed instead.
+        """
+        if not discard:
+            if getattr(connection, 'unread_result', False):
+                discard = True
+            else:
+                try:
+                    # End any open transaction so the next user gets a fresh snapshot
+                    connection.rollback()
+                except Error:
+                    discard = True
+        if discard or self._closed:
+            with self._cond:
+                self._stats['discarded'] += 1
+            self._close(connection)
+            return
+        created_at = self._created_at.get(id(connection), time.monotonic())
+        with self._cond:
+            self._idle.append((connection, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def _close(self, connection):
+        self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager around acquire()/release()."""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        except BaseException:
+            self.release(connection, discard=getattr(connection, 'unread_result', False))
+            raise
+        else:
+            self.release(connection)
+
+    def stats(self):
+        """Returns a snapshot of pool usage and checkout metrics."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._open - len(self._idle)
+            stats['size'] = self.size
+        checkouts = stats['checkouts']
+        stats['avg_wait'] = stats['wait_time'] / checkouts if checkouts else 0.0
+        return stats
+
+    def close(self):
+        """Closes idle connections; checked-out ones close on release."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection, _, _ in idle:
+            self._close(connection)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_options = {}
+
+
+def configure_pool(**options):
+    """
+    Sets the options (size, checkout_timeout, max_lifetime, ping_after or
+    connect arguments) for the shared pool, replacing any existing one.
+    """
+    global _pool, _pool_options
+    with _pool_lock:
+        old, _pool = _pool, None
+        _pool_options = options
+    if old is not None:
+        old.close()
+
+
+def get_pool():
+    """
+    Returns the process-wide pool, creating it on first use. A forked child
+    gets its own pool rather than sharing its parent's sockets.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(**_pool_options)
+        return _pool
+
+
+def pooled_connection(timeout=None):
+    """Context manager yielding a connection from the shared pool."""
+    return get_pool().connection(timeout)
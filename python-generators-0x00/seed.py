@@ -2,17 +2,21 @@
 
 import os
 import csv
+import json
+import time
 import uuid
 import mysql.connector
 from mysql.connector import Error
 
+from db_pool import DB_CONFIG
+
 def connect_db():
     """ Connect to MySQL database """
     try:
         connection = mysql.connector.connect(
-            host='localhost',
-            user='alxprodev_user',
-            password='@1Suburban.'
+            host=DB_CONFIG['host'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password']
         )
         return connection
     except Error as e:
@@ -30,14 +34,13 @@ def create_database(connection):
     finally:
         cursor.close()
 
-def connect_to_prodev():
+def connect_to_prodev(allow_local_infile=False):
     """ Connect to the ALX_prodev database """
+    # A dedicated connection: seeding is one-off and callers close it themselves
     try:
         connection = mysql.connector.connect(
-            host='localhost',
-            user='alxprodev_user',
-            password='@1Suburban.',
-            database='ALX_prodev'
+            **DB_CONFIG,
+            allow_local_infile=allow_local_infile
         )
         return connection
     except Error as e:
@@ -53,7 +56,10 @@ def create_table(connection):
             user_id VARCHAR(36) PRIMARY KEY,
             name VARCHAR(255) NOT NULL,
             email VARCHAR(255) NOT NULL,
-            age DECIMAL NOT NULL
+            age DECIMAL NOT NULL,
+            updated_at TIMESTAMP(6) NOT NULL
+                DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+            INDEX idx_user_data_updated_at (updated_at, user_id)
         );
         """
         cursor.execute(create_table_query)
@@ -62,6 +68,31 @@ def create_table(connection):
         print("Table user_data created successfully")
     except Error as e:
         print(f"Error creating table: {e}")
+        return
+    # CREATE TABLE IF NOT EXISTS leaves an older table as it was
+    add_updated_at_column(connection)
+
+def add_updated_at_column(connection):
+    """Adds the updated_at change-tracking column to a user_data table created before it existed."""
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data'
+        AND COLUMN_NAME = 'updated_at'
+        """)
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+            ALTER TABLE user_data
+            ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+                DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+            ADD INDEX idx_user_data_updated_at (updated_at, user_id)
+            """)
+            connection.commit()
+            print("Column updated_at added to user_data.")
+        cursor.close()
+    except Error as e:
+        print(f"Error adding updated_at column: {e}")
 
 def insert_data(connection, filename):
     """Inserts data from CSV into the user_data table if not already inserted."""
@@ -89,3 +120,119 @@ def insert_data(connection, filename):
         print(f"Error inserting data: {e}")
     except FileNotFoundError:
         print(f"CSV file '{filename}' not found.")
+
+
+def _read_checkpoint(checkpoint_file, filename):
+    """Returns how many CSV rows of `filename` a previous load already committed."""
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return 0
+    with open(checkpoint_file, mode='r', encoding='utf-8') as file:
+        state = json.load(file)
+    if state.get('file') != os.path.abspath(filename):
+        return 0
+    return state.get('rows', 0)
+
+
+def _write_checkpoint(checkpoint_file, filename, rows):
+    """Atomically records that the first `rows` CSV rows are committed."""
+    tmp_file = f"{checkpoint_file}.tmp"
+    with open(tmp_file, mode='w', encoding='utf-8') as file:
+        json.dump({'file': os.path.abspath(filename), 'rows': rows}, file)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def bulk_insert_data(connection, filename, batch_size=5000, checkpoint_file=None):
+    """
+    Loads the CSV into user_data in batches of `batch_size` rows.
+
+    Each batch goes through executemany, which mysql.connector rewrites into
+    a single multi-row INSERT, and is committed on its own. When
+    `checkpoint_file` is given, the number of committed rows is saved after
+    every batch and a rerun skips them, so a failed load resumes where it
+    stopped. Progress and throughput are printed per batch.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be a positive integer")
+
+    query = """
+    INSERT IGNORE INTO user_data (user_id, name, email, age)
+    VALUES (%s, %s, %s, %s)
+    """
+    cursor = None
+    try:
+        done = _read_checkpoint(checkpoint_file, filename)
+        if done:
+            print(f"Resuming after {done} rows already loaded.")
+        cursor = connection.cursor()
+        inserted_count = 0
+        started = time.perf_counter()
+        with open(filename, mode='r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            batch = []
+            for position, row in enumerate(reader):
+                if position < done:
+                    continue
+                batch.append((str(uuid.uuid4()), row['name'], row['email'], row['age']))
+                if len(batch) < batch_size:
+                    continue
+                cursor.executemany(query, batch)
+                connection.commit()
+                inserted_count += len(batch)
+                batch = []
+                if checkpoint_file:
+                    _write_checkpoint(checkpoint_file, filename, done + inserted_count)
+                elapsed = time.perf_counter() - started
+                print(f"{done + inserted_count} rows loaded "
+                      f"({inserted_count / elapsed:,.0f} rows/s)")
+            if batch:
+                cursor.executemany(query, batch)
+                connection.commit()
+                inserted_count += len(batch)
+
+        elapsed = time.perf_counter() - started
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+        rate = inserted_count / elapsed if elapsed else 0
+        print(f"{inserted_count} rows inserted successfully in {elapsed:.2f}s "
+              f"({rate:,.0f} rows/s).")
+    except Error as e:
+        connection.rollback()
+        print(f"Error inserting data: {e}")
+    except FileNotFoundError:
+        print(f"CSV file '{filename}' not found.")
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+
+def load_data_infile(connection, filename):
+    """
+    Loads the CSV with a single LOAD DATA LOCAL INFILE statement.
+
+    This is the fastest path but is all-or-nothing: there are no per-batch
+    checkpoints. The connection must come from
+    connect_to_prodev(allow_local_infile=True) and the server must have
+    local_infile enabled.
+    """
+    query = """
+    LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE user_data
+    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+    LINES TERMINATED BY '\\n'
+    IGNORE 1 LINES
+    (name, email, age)
+    SET user_id = UUID()
+    """
+    if not os.path.exists(filename):
+        print(f"CSV file '{filename}' not found.")
+        return
+    try:
+        cursor = connection.cursor()
+        started = time.perf_counter()
+        cursor.execute(query, (os.path.abspath(filename),))
+        connection.commit()
+        elapsed = time.perf_counter() - started
+        rate = cursor.rowcount / elapsed if elapsed else 0
+        print(f"{cursor.rowcount} rows loaded in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+        cursor.close()
+    except Error as e:
+        print(f"Error loading data: {e}")
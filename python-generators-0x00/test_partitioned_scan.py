@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Test cases for the queries 5-partitioned_scan sends to MySQL."""
+
+import unittest
+
+from mysql.connector.conversion import MySQLConverter
+from mysql.connector.cursor import RE_PY_PARAM, _ParamSubstitutor
+
+partitioned_scan = __import__('5-partitioned_scan')
+
+
+def render(query, params):
+    """Substitutes params into query the way mysql.connector's cursor does."""
+    converter = MySQLConverter()
+    values = [converter.quote(converter.escape(converter.to_mysql(value)))
+              for value in params]
+    substitutor = _ParamSubstitutor(values)
+    statement = RE_PY_PARAM.sub(substitutor, query.encode('utf-8'))
+    if substitutor.remaining:
+        raise AssertionError("Not all parameters were used in the SQL statement")
+    return statement.decode('utf-8')
+
+
+class TestPartitionQuery(unittest.TestCase):
+    """Test the SQL built for one partition of a scan."""
+
+    def test_bucket_query(self):
+        """Test that a bucket partition filters on CRC32 modulo the partition count."""
+        query, params = partitioned_scan._partition_query(
+            1, ['user_id', 'age'], False, 'bucket', 4)
+        self.assertEqual(render(query, params),
+                         "SELECT user_id, age FROM user_data WHERE MOD(CRC32(user_id), 4) = 1")
+
+    def test_range_query(self):
+        """Test that a middle range partition is bounded on both ends."""
+        low, high = partitioned_scan.key_ranges(4)[1]
+        query, params = partitioned_scan._partition_query(
+            (low, high), ['user_id'], True, 'range', 4)
+        self.assertEqual(render(query, params),
+                         "SELECT user_id FROM user_data WHERE user_id >= '40000000' "
+                         "AND user_id < '80000000' ORDER BY user_id")
+
+    def test_open_range_query(self):
+        """Test that the first and last partitions leave one end open."""
+        first, last = partitioned_scan.key_ranges(2)
+        query, params = partitioned_scan._partition_query(first, ['user_id'], False, 'range', 2)
+        self.assertEqual(render(query, params),
+                         "SELECT user_id FROM user_data WHERE user_id < '80000000'")
+        query, params = partitioned_scan._partition_query(last, ['user_id'], False, 'range', 2)
+        self.assertEqual(render(query, params),
+                         "SELECT user_id FROM user_data WHERE user_id >= '80000000'")
+
+
+if __name__ == '__main__':
+    unittest.main()